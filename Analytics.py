@@ -0,0 +1,135 @@
+import threading
+
+import numpy as np
+from DatabaseConnection import DatabaseConnection
+from TradingSimulator import TradingSimulator
+
+class Analytics:
+    """
+    Portfolio metrics of stored simulations, worked out with NumPy from each simulation's total value
+    (cash balance plus portfolio value) at the end of every simulated day.
+    Results are cached per simulation and worked out again once rows have been appended to it.
+    Usage:
+    1. Analytics.shared() (or create one with a risk free rate)
+    2. Call metrics() with a simulation ID, or metrics_for_all() for every stored simulation
+    """
+    trading_days = 252 #simulated days per year, used to annualise
+    _shared = None
+    _lock = threading.Lock()
+
+    def __init__(self, risk_free_rate: float = 0.0):
+        self.risk_free_rate = risk_free_rate #yearly, e.g. 0.04 for 4%
+        self.cache = {} #{(database path, sim_id): (last entry_number, metrics)}
+        self.cache_lock = threading.Lock() #metrics are read from the GUI thread and the simulation worker
+
+    @classmethod
+    def shared(cls) -> "Analytics":
+        with cls._lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def invalidate(self, sim_id: str = None) -> None:
+        """Forget the cached metrics of one simulation, or of every simulation."""
+        with self.cache_lock:
+            if sim_id is None:
+                self.cache.clear()
+            else:
+                self.cache.pop((DatabaseConnection.get_path(), sim_id), None)
+
+    def metrics(self, sim_id: str) -> dict:
+        """Metrics of a stored simulation (see compute), from the cache while no rows have been added."""
+        conn = DatabaseConnection.get()
+        key = (DatabaseConnection.get_path(), sim_id)
+        #one lookup on the sim_id/entry_number index tells whether rows have been appended
+        last_entry = conn.execute("SELECT MAX(entry_number) FROM simulationResults WHERE sim_id = ?", (sim_id,)).fetchone()[0]
+        if last_entry is None:
+            with self.cache_lock:
+                self.cache.pop(key, None)
+            raise ValueError(f"No simulation data found for ID: {sim_id}")
+        with self.cache_lock:
+            cached = self.cache.get(key)
+        if cached is not None and cached[0] == last_entry:
+            return dict(cached[1])
+
+        rows = TradingSimulator.last_rows_per_day(sim_id, ["current_balance", "portfolio_value"])
+        values = np.array([row[1] for row in rows], dtype=float) + np.array([row[2] for row in rows], dtype=float)
+        #cash_invested and cash_withdrawn add up every purchase and sale, so the latest row of each stock has the totals
+        start_balance, traded = conn.execute("""
+            SELECT MAX(start_balance), SUM(cash_invested) + SUM(cash_withdrawn)
+            FROM simulationSnapshots WHERE sim_id = ?
+        """, (sim_id,)).fetchone()
+        start_balance = values[0] if start_balance is None else start_balance
+
+        metrics = self.compute(values, start_balance, traded or 0.0, self.risk_free_rate)
+        with self.cache_lock:
+            #a newer result stored by another thread in the meantime is kept
+            if key not in self.cache or self.cache[key][0] <= last_entry:
+                self.cache[key] = (last_entry, metrics)
+        return dict(metrics)
+
+    def metrics_for_all(self, sim_ids=None) -> dict:
+        """{sim_id: metrics} of the given simulations (every stored simulation with rows by default)."""
+        if sim_ids is None:
+            conn = DatabaseConnection.get()
+            sim_ids = [row[0] for row in conn.execute("""
+                SELECT sim_id FROM simulations
+                WHERE EXISTS (SELECT 1 FROM simulationResults WHERE simulationResults.sim_id = simulations.sim_id)
+                ORDER BY created
+            """)]
+        return {sim_id: self.metrics(sim_id) for sim_id in sim_ids}
+
+    @classmethod
+    def compute(cls, values, start_balance: float, traded: float = 0.0, risk_free_rate: float = 0.0) -> dict:
+        """
+        Metrics of a daily total value series:
+            final_value, return_pct     value on the last day and return on the starting balance
+            cagr_pct                    compound yearly growth, counting trading_days days per year
+            volatility_pct              yearly standard deviation of the daily returns
+            sharpe, sortino             yearly mean excess return over its standard deviation
+                                        (sortino: over the downside deviation only)
+            max_drawdown_pct            largest fall from a previous high
+            max_drawdown_days           days from that high until the value got back to it (or the last day)
+            win_rate_pct                share of the days the value changed on that it went up
+            turnover                    value bought and sold over the average total value
+            days                        number of simulated days
+        """
+        values = np.asarray(values, dtype=float)
+        days = len(values)
+        if days == 0:
+            raise ValueError("No simulated days to work out metrics from")
+        final_value = float(values[-1])
+        years = (days - 1) / cls.trading_days
+        growth = final_value / start_balance
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(values) / values[:-1]
+        returns = returns[np.isfinite(returns)]
+        excess = returns - risk_free_rate / cls.trading_days
+        deviation = returns.std(ddof=1) if len(returns) > 1 else 0.0
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2)) if len(returns) else 0.0
+        annualise = np.sqrt(cls.trading_days)
+        changed = returns[returns != 0]
+
+        #drawdown from the running high, and how long the worst one lasted
+        peak = np.maximum.accumulate(values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(peak > 0, (peak - values) / peak, 0.0)
+        trough = int(np.argmax(drawdown))
+        high = trough - int(np.argmax(values[trough::-1] == peak[trough]))
+        recovered = np.flatnonzero(values[trough:] >= peak[trough])
+        recovery = trough + int(recovered[0]) if len(recovered) else days - 1
+
+        return {
+            "final_value": final_value,
+            "return_pct": (growth - 1) * 100,
+            "cagr_pct": (growth ** (1 / years) - 1) * 100 if years > 0 and growth > 0 else 0.0,
+            "volatility_pct": float(deviation * annualise * 100),
+            "sharpe": float(excess.mean() / deviation * annualise) if deviation > 0 else 0.0,
+            "sortino": float(excess.mean() / downside * annualise) if downside > 0 else 0.0,
+            "max_drawdown_pct": float(drawdown[trough]) * 100,
+            "max_drawdown_days": recovery - high if drawdown[trough] > 0 else 0,
+            "win_rate_pct": float(np.mean(changed > 0)) * 100 if len(changed) else 0.0,
+            "turnover": float(traded / values.mean()) if values.mean() > 0 else 0.0,
+            "days": days,
+        }
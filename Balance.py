@@ -1,5 +1,3 @@
-import sqlite3
-
 class Balance:
     #initialising the instance variables
     def __init__(self, startBalance:float):
@@ -12,6 +10,7 @@ class Balance:
         #updated daily
         self.portfolioValue = 0.0 #combined value of all stocks
         self.portfolioPerformance = 0.0
+        self.investmentValues = {} #{ticker: investment value} making up portfolioValue
 
     #getter and setter methods for the instance variables
     def setStartBalance(self, startBalance:float):
@@ -46,6 +45,8 @@ class Balance:
         self.portfolioValue = portfolioValue
     def getPortfolioValue(self):
         return self.portfolioValue
+    def getInvestmentValue(self, ticker: str) -> float:
+        return self.investmentValues.get(ticker, 0.0)
 
     def setPortfolioPerformance(self, balancePerformance: float):
         self.portfolioPerformance = balancePerformance
@@ -58,10 +59,13 @@ class Balance:
         if self.currentBalance >= price:
             self.currentBalance -= price
             self.totalInvestedBalance += price
+            previous_profit = Stock.get_cash_profit()
             Stock.set_cash_invested(Stock.get_cash_invested() + price)
             Stock.set_number_stocks(Stock.get_number_stocks() + amount)
             Stock.update_cash_profit()
+            self.totalCashProfit += Stock.get_cash_profit() - previous_profit
             Stock.update_investment_value()
+            self.update_portfolio_value(Stock)
             return True
         else:
             print("Insufficient balance to purchase stocks.")
@@ -73,12 +77,13 @@ class Balance:
             price = Stock.get_current_stock_value() * amount
             self.currentBalance += price
             self.totalInvestedBalance -= price
+            previous_profit = Stock.get_cash_profit()
             Stock.set_cash_withdrawn(Stock.get_cash_withdrawn() + price)
             Stock.set_number_stocks(Stock.get_number_stocks() - amount)
-            self.totalCashProfit =- Stock.get_cash_profit() #remove previous profit from total
             Stock.update_cash_profit()
-            self.totalCashProfit =+ Stock.get_cash_profit() #add new profit to total
+            self.totalCashProfit += Stock.get_cash_profit() - previous_profit #swap the stock's old profit for its new one
             Stock.update_investment_value()
+            self.update_portfolio_value(Stock)
             return True
         else:
             print("Insufficient stocks to sell.")
@@ -90,65 +95,45 @@ class Balance:
         print("current balance reset to: £" + str(self.currentBalance))
         self.portfolioValue = 0.0
         self.totalInvestedBalance = 0.0
+        self.totalCashProfit = 0.0
         self.portfolioPerformance = 0.0
+        self.investmentValues = {}
+
+    def set_balance_from_sim(self, snapshot: list[dict], Stocks) -> None:
+        """Set the balance instance variables from a simulation's snapshot
+        (the latest row of each stock, oldest first, see TradingSimulator.get_simulation_snapshot)."""
+        if not snapshot:
+            raise ValueError("No simulation data to set the balance from")
+        latest = snapshot[-1]
+        self.startBalance = latest["start_balance"]
+        self.currentBalance = latest["current_balance"]
+        self.totalInvestedBalance = latest["total_invested_balance"]
+        self.totalCashProfit = latest["total_cash_profit"]
+
+        #latest investment value of every stock
+        values = {row["ticker"]: row["investment_value"] for row in snapshot}
+        self.portfolioValue = 0.0
+        self.investmentValues = {}
+        for stock in Stocks:
+            ticker = stock.get_ticker()
+            if ticker not in values:
+                raise ValueError(f"No investment value found for stock {stock.get_name()}")
+            self.investmentValues[ticker] = values[ticker]
+            self.portfolioValue += values[ticker]
+        self.update_portfolio_performance()
 
-    def set_balance_from_sim(self, simulation_id: str, Stocks) -> None:
-        """Set the balance instance variables based on the first and last date in the simulation data."""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-
-        cursor.execute(f"""
-                SELECT current_balance
-                FROM {simulation_id}
-                WHERE entry_number = (SELECT MIN(entry_number) FROM {simulation_id})
-            """)
-        result = cursor.fetchone()
-        if result is None:
-            raise ValueError(f"No starting balance found for simulation {simulation_id}")
-        self.startBalance = result[0]
-
-        cursor.execute(f"""
-                SELECT current_balance, total_invested_balance
-                FROM {simulation_id}
-                WHERE entry_number = (SELECT MAX(entry_number) FROM {simulation_id})
-            """)
-        result = cursor.fetchone()
-        conn.close()
-
-        if result is None:
-            raise ValueError(f"No ending balance found for simulation {simulation_id}")
-        
-        self.currentBalance, self.totalInvestedBalance = result
-        self.daily_balance_update(simulation_id, Stocks)
-
-    def daily_balance_update(self, simulation_id: str, list_of_stocks):
+    def daily_balance_update(self, Stock):
         """update instance variables which change daily based on stock performance"""
-        self.update_portfolio_value(simulation_id, list_of_stocks)
+        self.update_portfolio_value(Stock)
         self.update_portfolio_performance()
 
-    def update_portfolio_value(self, simulation_id, list_of_stocks):
-        """calculate portfolio value by combining all stock investment value 
-        on the last date in the simulation"""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        
-        portfolio_value = 0.0
-        for stock in list_of_stocks:
-            ticker = stock.get_ticker()
-            cursor.execute(f"""
-                SELECT investment_value
-                FROM {simulation_id}
-                WHERE ticker = ?
-                ORDER BY entry_number DESC
-                LIMIT 1
-            """, (ticker,))
-            result = cursor.fetchone()
-            if not result:
-                raise ValueError(f"No investment value found for stock {stock.get_name()}")
-            investment_value = result[0]
-            portfolio_value += investment_value
-
-        self.portfolioValue = portfolio_value  
+    def update_portfolio_value(self, Stock):
+        """swap a stock's previous investment value for its current one in the portfolio value.
+        The portfolio value is a running total, so this costs the same however many stocks there are"""
+        ticker = Stock.get_ticker()
+        investment_value = Stock.get_investment_value()
+        self.portfolioValue += investment_value - self.investmentValues.get(ticker, 0.0)
+        self.investmentValues[ticker] = investment_value
 
     def update_portfolio_performance(self):
         """calculate how much profit has been generated by invested balance"""
@@ -159,24 +144,3 @@ class Balance:
         
         performance = (profit/self.totalInvestedBalance)*100
         self.portfolioPerformance = performance
-        
-    def update_total_cash_profit(self, simulation_id: str, Stock):
-        """calculate total cash profit by combining all cash profits from each 
-        stock on the last date in the simulation"""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        
-        ticker = Stock.get_ticker()
-        cursor.execute(f"""
-            SELECT cash_profit
-            FROM {simulation_id}
-            WHERE ticker = ?
-            ORDER BY entry_number DESC
-            LIMIT 1
-        """, (ticker,))
-        result = cursor.fetchone()
-        if not result:
-            raise ValueError(f"No cash profit found for stock: {Stock.get_name()}")
-        cash_profit = result[0]
-
-        self.total_cash_profit += cash_profit
\ No newline at end of file
@@ -1,14 +1,45 @@
-import sqlite3
-import yfinance
+import csv
+import json
+import os
+import time
+import threading
+from datetime import datetime, date, timedelta
+from itertools import repeat
+from DatabaseConnection import DatabaseConnection
+from MarketDataProvider import MarketDataProvider, YFinanceProvider
+from PriceStore import PriceStore
 
 class Database:
-    
-    def __init__(self, startDate=None, endDate=None):
-        self.stocks = ["Apple Inc.", "Alphabet Inc.", "Microsoft Corporation", "Amazon.com Inc.", "Tesla Inc.", 
-            "Meta Platforms Inc.", "NVIDIA Corporation","Berkshire Hathaway Inc.", "Visa Inc.", "Johnson & Johnson"]
-        self.tickers = ["AAPL", "GOOGL", "MSFT","AMZN", "TSLA", "META", "NVDA", "BRK-B", "V", "JNJ"]
+    #universe used when no universe file is given
+    defaultUniverse = {"AAPL": "Apple Inc.", "GOOGL": "Alphabet Inc.", "MSFT": "Microsoft Corporation",
+        "AMZN": "Amazon.com Inc.", "TSLA": "Tesla Inc.", "META": "Meta Platforms Inc.", "NVDA": "NVIDIA Corporation",
+        "BRK-B": "Berkshire Hathaway Inc.", "V": "Visa Inc.", "JNJ": "Johnson & Johnson"}
+    #held by a simulation run while it uses the shared dates and prices, and by a refresh while it swaps
+    #new ones in, so a run never sees them change part way
+    dataLock = threading.RLock()
+
+    def __init__(self, startDate=None, endDate=None, provider: MarketDataProvider = None, universeFile: str = None):
+        #tickers to simulate: a CSV/JSON universe file, the TRADING_SIMULATOR_UNIVERSE file or the default ten
+        self.universeFile = universeFile or os.environ.get("TRADING_SIMULATOR_UNIVERSE")
+        self.names = self.loadUniverse(self.universeFile) if self.universeFile else dict(self.defaultUniverse) #{ticker: name}
+        self.tickers = list(self.names)
+        self.stocks = list(self.names.values())
         self.startDate = startDate
         self.endDate = endDate
+        self.batchSize = 50000 #rows per executemany call when ingesting
+        self.provider = provider or YFinanceProvider() #where price history is downloaded from
+        self.maxWorkers = 8 #concurrent downloads
+        self.frames = {} #{ticker: DataFrame} fetched by fetchData
+        self.maxCacheAge = timedelta(hours=24) #local data older than this is stale
+        self.refreshPolicy = "background" #stale data: "background" refresh, "blocking" refresh or "manual" only
+        self.refreshThread = None
+        self.simulationColumns = ["date", "current_balance", "total_invested_balance", "total_cash_profit", "portfolio_value",
+            "portfolio_performance", "ticker", "cash_invested", "cash_withdrawn", "investment_value",
+            "investment_performance", "current_stock_performance", "number_of_stocks"]
+        self.snapshotColumns = ["sim_id", "ticker", "entry_number", "start_date", "start_balance"] + \
+            [column for column in self.simulationColumns if column != "ticker"]
+        self.summaryColumns = {"start_date": "TEXT", "end_date": "TEXT", "start_balance": "REAL",
+            "final_value": "REAL", "return_pct": "REAL"} #per simulation summary in the simulations table
 
     #getter methods
     def getStocks(self):
@@ -16,8 +47,8 @@ class Database:
     def getTickers(self):
         return self.tickers
     def getStockName(self, ticker):
-        if ticker in self.tickers:
-            return self.stocks[self.tickers.index(ticker)]
+        if ticker in self.names:
+            return self.names[ticker]
         else:
             raise ValueError(f"Ticker {ticker} not found in the list of stocks.")
     def getStartDate(self):
@@ -25,10 +56,47 @@ class Database:
     def getEndDate(self):
         return self.endDate
 
+    # Read a universe file into {ticker: name}, keeping the file's order
+    @staticmethod
+    def loadUniverse(path: str) -> dict:
+        """
+        CSV files need a "ticker" column and may have a "name" column.
+        JSON files hold {ticker: name}, a list of tickers or a list of {"ticker": ..., "name": ...} objects.
+        Tickers without a name are named after themselves.
+        """
+        if path.lower().endswith(".json"):
+            with open(path) as file:
+                data = json.load(file)
+            if isinstance(data, dict):
+                entries = list(data.items())
+            else:
+                entries = [(entry, None) if isinstance(entry, str) else (entry.get("ticker"), entry.get("name"))
+                           for entry in data]
+        else:
+            with open(path, newline="") as file:
+                reader = csv.DictReader(file)
+                columns = {column.strip().lower(): column for column in reader.fieldnames or []}
+                if "ticker" not in columns:
+                    raise ValueError(f"Universe file {path} has no ticker column")
+                entries = [(row[columns["ticker"]], row[columns["name"]] if "name" in columns else None)
+                           for row in reader]
+
+        universe = {}
+        for ticker, name in entries:
+            ticker = (ticker or "").strip().upper()
+            if not ticker:
+                continue
+            if ticker in universe:
+                raise ValueError(f"Ticker {ticker} appears more than once in universe file {path}")
+            universe[ticker] = (name or "").strip() or ticker
+        if not universe:
+            raise ValueError(f"No tickers found in universe file {path}")
+        return universe
+
     # Connect to the SQLite database (or create it if it doesn't exist)
     def createDatabase(self) -> None:
         # Connect to the SQLite database (or create it if it doesn't exist)
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
 
         # Create a table datasbase for storing historical data
@@ -45,73 +113,311 @@ class Database:
             )
         """)
 
-        cursor.close()    
-        conn.close()
+        # Create a table recording what each ticker's local data covers and when it was last refreshed
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cacheManifest (
+                stock_ticker TEXT PRIMARY KEY,
+                first_date TEXT,
+                last_date TEXT,
+                last_refresh TEXT
+            )
+        """)
 
-    # Define the date range for fetching historical data using the earliest and latest dates across all tickers
-    def defineDates(self) -> None:
-        earliestDates = []
-        latestDates = []
+        # Create one table holding the metadata of every simulation and a summary of its latest state,
+        # updated with every flush so listing simulations never reads their rows
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS simulations (
+                sim_id TEXT PRIMARY KEY,
+                name TEXT,
+                created TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                start_balance REAL,
+                final_value REAL,
+                return_pct REAL
+            )
+        """)
+        # Databases created before the summary columns existed get them added
+        cursor.execute("PRAGMA table_info(simulations)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, columnType in self.summaryColumns.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE simulations ADD COLUMN {column} {columnType}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_simulations_created ON simulations (created)")
+
+        # Create one table holding the daily rows of every simulation, keyed by simulation ID
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS simulationResults (
+                entry_number INTEGER PRIMARY KEY AUTOINCREMENT,
+                sim_id TEXT NOT NULL,
+                date TEXT,
+                current_balance REAL,
+                total_invested_balance REAL,
+                total_cash_profit REAL,
+                portfolio_value REAL,
+                portfolio_performance REAL,
+                ticker TEXT,
+                cash_invested REAL,
+                cash_withdrawn REAL,
+                investment_value REAL,
+                investment_performance REAL,
+                current_stock_performance REAL,
+                number_of_stocks INTEGER,
+                loop_number INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Databases created before loop_number existed get it added, their loops are numbered below
+        cursor.execute("PRAGMA table_info(simulationResults)")
+        numberLoops = "loop_number" not in {row[1] for row in cursor.fetchall()}
+        if numberLoops:
+            cursor.execute("ALTER TABLE simulationResults ADD COLUMN loop_number INTEGER NOT NULL DEFAULT 0")
+        #graphs take the last row of each (loop, date) of a simulation or of one of its stocks
+        for index in ("idx_results_sim_ticker", "idx_results_sim_ticker_date", "idx_results_sim_date"):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_sim_ticker_loop_date ON simulationResults (sim_id, ticker, loop_number, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_sim_loop_date ON simulationResults (sim_id, loop_number, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_sim_entry ON simulationResults (sim_id, entry_number)")
+
+        # Create one table holding the latest row of every stock in every simulation, kept up to date on
+        # each flush, so a simulation can be resumed without searching simulationResults
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS simulationSnapshots (
+                sim_id TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                entry_number INTEGER NOT NULL,
+                start_date TEXT,
+                start_balance REAL,
+                date TEXT,
+                current_balance REAL,
+                total_invested_balance REAL,
+                total_cash_profit REAL,
+                portfolio_value REAL,
+                portfolio_performance REAL,
+                cash_invested REAL,
+                cash_withdrawn REAL,
+                investment_value REAL,
+                investment_performance REAL,
+                current_stock_performance REAL,
+                number_of_stocks INTEGER,
+                PRIMARY KEY (sim_id, ticker)
+            )
+        """)
+        conn.commit()
+
+        cursor.close()
+        self.migrateSimulationTables()
+        if numberLoops:
+            self.backfillLoopNumbers()
+        self.backfillSnapshots()
+        self.backfillSummaries()
+
+    # Move simulations stored in the old one-table-per-simulation layout into simulationResults
+    def migrateSimulationTables(self) -> None:
+        conn = DatabaseConnection.get()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type='table' AND name NOT IN ('historicalData', 'cacheManifest', 'simulations', 'simulationResults', 'simulationSnapshots')
+            AND name NOT LIKE 'sqlite_%'
+        """)
+        tables = [row[0] for row in cursor.fetchall()]
+
+        # Only tables with the simulation columns are simulations
+        legacyTables = []
+        for table in tables:
+            cursor.execute(f'PRAGMA table_info("{table}")')
+            columns = {row[1] for row in cursor.fetchall()}
+            if columns.issuperset(self.simulationColumns) and "entry_number" in columns:
+                legacyTables.append(table)
+        if not legacyTables:
+            cursor.close()
+            return
+
+        columnList = ", ".join(self.simulationColumns)
+        with conn:
+            for table in legacyTables:
+                # Simulation IDs look like sim_YYYYMMDD_N, renamed simulations keep their name as their ID
+                created = None
+                parts = table.split("_")
+                if len(parts) == 3 and parts[0] == "sim" and parts[1].isdigit() and len(parts[1]) == 8:
+                    created = f"{parts[1][:4]}-{parts[1][4:6]}-{parts[1][6:]}"
+                cursor.execute("INSERT OR IGNORE INTO simulations (sim_id, name, created) VALUES (?, ?, ?)",
+                               (table, table, created))
+                cursor.execute(f"""
+                    INSERT INTO simulationResults (sim_id, {columnList})
+                    SELECT ?, {columnList} FROM "{table}" ORDER BY entry_number
+                """, (table,))
+                cursor.execute(f'DROP TABLE "{table}"')
+        cursor.close()
+        self.backfillLoopNumbers(legacyTables)
+        print(f"Migrated {len(legacyTables)} simulation tables into simulationResults.")
+
+    # Number the loops of simulations saved before loop_number existed (all of them without simIds):
+    # a row dated before the row recorded ahead of it is where the simulation went back to its loop restart date
+    def backfillLoopNumbers(self, simIds: list = None) -> None:
+        where = ""
+        if simIds is not None:
+            where = f"WHERE sim_id IN ({', '.join('?' * len(simIds))})"
+        conn = DatabaseConnection.get()
+        with conn:
+            conn.execute(f"""
+                WITH restarts AS (
+                    SELECT entry_number, sim_id,
+                        date < LAG(date) OVER (PARTITION BY sim_id ORDER BY entry_number) AS restarted
+                    FROM simulationResults {where}
+                ), loops AS (
+                    SELECT entry_number, SUM(restarted) OVER (PARTITION BY sim_id ORDER BY entry_number) AS loop_number
+                    FROM restarts
+                )
+                UPDATE simulationResults SET loop_number = loops.loop_number
+                FROM loops
+                WHERE simulationResults.entry_number = loops.entry_number AND loops.loop_number > 0
+            """, simIds or [])
+
+    # Build the snapshot of simulations saved before simulationSnapshots existed
+    def backfillSnapshots(self) -> None:
+        conn = DatabaseConnection.get()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT sim_id FROM simulations AS s
+            WHERE NOT EXISTS (SELECT 1 FROM simulationSnapshots WHERE sim_id = s.sim_id)
+        """)
+        missing = [row[0] for row in cursor.fetchall()]
+
+        rowColumns = ", ".join(f"r.{column}" for column in self.simulationColumns if column != "ticker")
+        built = 0
+        with conn:
+            for simId in missing:
+                cursor.execute(f"""
+                    INSERT INTO simulationSnapshots ({", ".join(self.snapshotColumns)})
+                    SELECT r.sim_id, r.ticker, r.entry_number, f.date, f.current_balance, {rowColumns}
+                    FROM (
+                        SELECT MAX(entry_number) AS last_entry FROM simulationResults WHERE sim_id = ? GROUP BY ticker
+                    ) AS latest
+                    JOIN simulationResults AS r ON r.entry_number = latest.last_entry
+                    JOIN simulationResults AS f
+                        ON f.entry_number = (SELECT MIN(entry_number) FROM simulationResults WHERE sim_id = ?)
+                """, (simId, simId))
+                built += max(cursor.rowcount, 0)
+        cursor.close()
+        if built:
+            print(f"Built {built} simulation snapshot rows.")
 
+    # Fill in the summary of simulations saved before the summary columns existed, from their snapshot
+    def backfillSummaries(self) -> None:
+        conn = DatabaseConnection.get()
+        with conn:
+            cursor = conn.execute("""
+                UPDATE simulations SET
+                    start_date = latest.start_date, end_date = latest.date, start_balance = latest.start_balance,
+                    final_value = latest.final_value,
+                    return_pct = CASE WHEN latest.start_balance > 0
+                        THEN (latest.final_value / latest.start_balance - 1) * 100 ELSE 0 END
+                FROM (
+                    SELECT sim_id, start_date, start_balance, date, current_balance + portfolio_value AS final_value
+                    FROM simulationSnapshots AS s
+                    WHERE entry_number = (SELECT MAX(entry_number) FROM simulationSnapshots WHERE sim_id = s.sim_id)
+                ) AS latest
+                WHERE simulations.sim_id = latest.sim_id AND simulations.final_value IS NULL
+            """)
+        if cursor.rowcount > 0:
+            print(f"Summarised {cursor.rowcount} simulations.")
+
+    # Download the full history of every ticker once, concurrently, and keep it for defineDates and downloadData
+    def fetchData(self) -> None:
+        frames = self.provider.downloadAll(self.tickers, self.maxWorkers)
         for ticker in self.tickers:
-            data = yfinance.download(ticker, period="max")
-            # Check if data is None or empty
-            if data is None or data.empty:
+            if ticker not in frames:
                 raise ValueError(f"No data found for ticker {ticker}.")
-            earliestDates.append(data.index.min())
-            latestDates.append(data.index.max())
+        self.frames = frames
+
+    # Define the date range for fetching historical data using the earliest and latest dates across all tickers
+    def defineDates(self) -> None:
+        if not self.frames:
+            self.fetchData()
+        self.startDate, self.endDate = self.sharedDates()
+
+    # Shared date range of the fetched history, without setting it
+    def sharedDates(self) -> tuple[date, date]:
+        earliestDates = [frame.index.min() for frame in self.frames.values()]
+        latestDates = [frame.index.max() for frame in self.frames.values()]
 
         startDate = max(earliestDates).date()  # Get the earliest shared date across all tickers
         endDate = min(latestDates).date()  # Get the latest shared date across all tickers
+        return startDate, endDate
 
-        self.startDate = startDate
-        self.endDate = endDate
-
-    # download stock data and insert it into the database
-    def downloadData(self, startDate, endDate) -> None:  
+    # download stock data and insert it into the database, returns the number of rows inserted
+    def downloadData(self, startDate, endDate) -> int:
         # Connect to the SQLite database
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
+        conn = DatabaseConnection.get()
+        changes_before = conn.total_changes
+        started = time.perf_counter()
+        batch = []
 
-        #fetch data for each ticker
-        for ticker in self.tickers:
-            try:
-                #access yfinance and download the data for a stock (using its ticker)
-                stockData = yfinance.download(ticker, start=startDate, end=endDate)
-                # Check if the data is empty
-                if stockData is None or len(stockData) == 0:
-                    raise ValueError(f"No data found for ticker {ticker} in the specified date range.")
-
-                #loop through each date in the stock data
-                for date in stockData.index:
-                    
-                    row = stockData.loc[date]
-                    #insert data into the histroicalData table
-                    cursor.execute("""
-                        INSERT OR IGNORE INTO historicalData (
-                            date, open, high, low, close, stock_ticker, stock_name
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        (date.date()), #.date() converts datetime to date
-                        (float(row["Open"].iloc[0])), #convert series to float
-                        (float(row["High"].iloc[0])), 
-                        (float(row["Low"].iloc[0])),
-                        (float(row["Close"].iloc[0])),
-                        ticker,
-                        self.stocks[self.tickers.index(ticker)]  # Get the corresponding stock name
-                    ))
-                conn.commit() # Commit the changes to the database
-                print(f"Data for {ticker} from {startDate} to {endDate} inserted successfully.")
+        if not self.frames:
+            self.fetchData()
 
-            except Exception as e:
-                print(f"Error downloading or inserting data for {ticker}: {e}")
+        #all tickers are written inside one transaction, in batches of self.batchSize rows
+        with conn:
+            #fetch data for each ticker
+            for ticker in self.tickers:
+                try:
+                    #take the date range from the history already fetched for this ticker
+                    stockData = MarketDataProvider.sliceDates(self.frames[ticker], startDate, endDate)
+                    # Check if the data is empty
+                    if stockData is None or len(stockData) == 0:
+                        raise ValueError(f"No data found for ticker {ticker} in the specified date range.")
+
+                    batch.extend(self.frameToRows(ticker, self.getStockName(ticker), stockData))
+                    print(f"Data for {ticker} from {startDate} to {endDate} prepared successfully.")
+
+                except Exception as e:
+                    print(f"Error downloading or inserting data for {ticker}: {e}")
+
+                if len(batch) >= self.batchSize:
+                    self.insertRows(conn, batch)
+                    batch = []
+
+            self.insertRows(conn, batch)
+
+        #report ingest throughput
+        rows_inserted = conn.total_changes - changes_before
+        elapsed = time.perf_counter() - started
+        rate = rows_inserted / elapsed if elapsed > 0 else 0.0
+        print(f"Inserted {rows_inserted} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+        return rows_inserted
 
-        conn.close()
+    @staticmethod
+    def frameToRows(ticker: str, name: str, stockData) -> list[tuple]:
+        """Convert a downloaded DataFrame into historicalData rows using whole-column arrays."""
+        dates = stockData.index.strftime("%Y-%m-%d").tolist()
+        columns = []
+        for field in ("Open", "High", "Low", "Close"):
+            values = stockData[field].to_numpy(dtype=float)
+            if values.ndim > 1:  # yfinance returns one column per ticker
+                values = values[:, 0]
+            columns.append(values.tolist())
+        return list(zip(dates, *columns, repeat(ticker), repeat(name)))
+
+    @staticmethod
+    def insertRows(conn, rows: list[tuple]) -> None:
+        """Insert a batch of historicalData rows, skipping dates that are already stored."""
+        if not rows:
+            return
+        conn.executemany("""
+            INSERT OR IGNORE INTO historicalData (
+                date, open, high, low, close, stock_ticker, stock_name
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
 
     # Function to check if the database is empty or if new data is available, and update accordingly
-    def updateData(self) -> None:
+    # (up to the given end date, the database's end date by default). Returns the number of rows inserted
+    def updateData(self, startDate=None, endDate=None) -> int:
+        startDate = self.startDate if startDate is None else startDate
+        endDate = self.endDate if endDate is None else endDate
+        rowsInserted = 0
         # Connect to the SQLite database
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
 
         #add data to table if table is empty
@@ -119,28 +425,119 @@ class Database:
         count = cursor.fetchone()[0]  # Fetch the count from the result
         if count == 0:
             print("No data found in the database, downloading data...")
-            self.downloadData(self.startDate, self.endDate)
+            rowsInserted += self.downloadData(startDate, endDate)
 
         #add data to table if new data is available 
         cursor.execute("SELECT MAX(date) FROM historicalData")
         maxDate = cursor.fetchone()[0]  # Fetch the latest date from the result
 
-        if maxDate != str(self.endDate):
+        if maxDate != str(endDate):
             print("New data available, updating database...")
-            self.downloadData(maxDate, self.endDate)
+            rowsInserted += self.downloadData(maxDate, endDate)
+
+        cursor.close()
+        return rowsInserted
+
+    # Read the cache manifest: {ticker: (first_date, last_date, last_refresh)}
+    def readManifest(self) -> dict:
+        conn = DatabaseConnection.get()
+        cursor = conn.cursor()
+        cursor.execute("SELECT stock_ticker, first_date, last_date, last_refresh FROM cacheManifest")
+        manifest = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        #databases filled before the manifest existed (like the data.db shipped with the project): record their
+        #coverage as refreshed now, so they are used as they are until maxCacheAge has passed
+        if not manifest:
+            cursor.execute("""
+                SELECT stock_ticker, MIN(date), MAX(date)
+                FROM historicalData
+                GROUP BY stock_ticker
+            """)
+            refreshed = datetime.now().isoformat(timespec="seconds")
+            manifest = {row[0]: (row[1], row[2], refreshed) for row in cursor.fetchall()}
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO cacheManifest VALUES (?, ?, ?, ?)",
+                                 [(ticker, *entry) for ticker, entry in manifest.items()])
 
-        cursor.close()    
-        conn.close()
+        cursor.close()
+        return manifest
+
+    # Record the coverage of the data just fetched for every ticker
+    def writeManifest(self) -> None:
+        refreshed = datetime.now().isoformat(timespec="seconds")
+        rows = [(ticker, str(frame.index.min().date()), str(frame.index.max().date()), refreshed)
+                for ticker, frame in self.frames.items()]
+        conn = DatabaseConnection.get()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO cacheManifest VALUES (?, ?, ?, ?)", rows)
+
+    def isCacheComplete(self, manifest: dict) -> bool:
+        return all(ticker in manifest for ticker in self.tickers)
+
+    def isCacheStale(self, manifest: dict) -> bool:
+        oldest = datetime.now() - self.maxCacheAge
+        for ticker in self.tickers:
+            lastRefresh = manifest[ticker][2]
+            if lastRefresh is None or datetime.fromisoformat(lastRefresh) < oldest:
+                return True
+        return False
+
+    # Set the shared date range from the manifest without touching the network
+    def loadDatesFromCache(self, manifest: dict) -> None:
+        self.startDate = max(date.fromisoformat(manifest[ticker][0]) for ticker in self.tickers)
+        self.endDate = min(date.fromisoformat(manifest[ticker][1]) for ticker in self.tickers)
+
+    # Download fresh data from the provider, store it and update the manifest
+    def refreshData(self) -> None:
+        self.applyRefresh(*self.downloadRefresh())
+
+    # Download and store fresh data with its manifest, leaving the shared dates and prices alone.
+    # Returns the new date range and the number of rows inserted, for applyRefresh
+    def downloadRefresh(self) -> tuple:
+        self.fetchData()
+        startDate, endDate = self.sharedDates()
+        rowsInserted = self.updateData(startDate, endDate)
+        self.writeManifest()
+        self.frames = {}  # the downloaded frames are no longer needed
+        return startDate, endDate, rowsInserted
+
+    # Switch to a refresh's date range, and reload the cached prices if rows were added, between simulation runs
+    def applyRefresh(self, startDate, endDate, rowsInserted: int) -> None:
+        with Database.dataLock:
+            self.startDate = startDate
+            self.endDate = endDate
+            if rowsInserted > 0:
+                PriceStore.invalidate()
+
+    # Refresh on a daemon thread so callers can keep working with the local data.
+    # Only the download and the database write happen straight away, the new dates and prices
+    # are swapped in once no simulation is running (see dataLock)
+    def refreshInBackground(self) -> threading.Thread:
+        def refresh():
+            try:
+                self.applyRefresh(*self.downloadRefresh())
+                print("Background refresh of market data complete.")
+            except Exception as e:
+                print(f"Background refresh of market data failed: {e}")
+        self.refreshThread = threading.Thread(target=refresh, name="market-data-refresh", daemon=True)
+        self.refreshThread.start()
+        return self.refreshThread
 
     # Main function to initialize the database and update data
     def initialiseDatabase(self) -> None:
         # Create the database and table if they don't exist
         self.createDatabase()
 
-        # Define the date range for fetching historical data
-        self.defineDates()
-
-        # upload data
-        self.updateData()
+        # Cold start: nothing usable locally, so the data has to be downloaded now
+        manifest = self.readManifest()
+        if not self.isCacheComplete(manifest):
+            self.refreshData()
+            return
 
-    
+        # Warm start: use local data and refresh it according to the staleness policy
+        self.loadDatesFromCache(manifest)
+        if self.isCacheStale(manifest):
+            if self.refreshPolicy == "background":
+                self.refreshInBackground()
+            elif self.refreshPolicy == "blocking":
+                self.refreshData()
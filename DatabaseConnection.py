@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+
+class DatabaseConnection:
+    """
+    Shared connection layer for the SQLite database.
+    Each thread keeps one cached connection to the configured database file, opened
+    with the same pragmas. Reusing a connection also reuses sqlite3's statement cache,
+    so a query that runs every simulated day is only prepared once.
+    Usage:
+    1. Optionally call set_path() to point at another database file
+    2. Call get() wherever a connection is needed (do not close it)
+    """
+    db_path = os.environ.get("TRADING_SIMULATOR_DB", "data.db")
+    pragmas = {
+        "journal_mode": "WAL",       # readers do not block the writer
+        "synchronous": "NORMAL",     # fsync on checkpoint rather than every commit (safe with WAL)
+        "cache_size": -64000,        # 64MB page cache
+        "mmap_size": 268435456,      # 256MB memory mapped I/O
+        "temp_store": "MEMORY",
+    }
+    cached_statements = 256
+    _local = threading.local()
+    _generation = 0
+
+    @classmethod
+    def set_path(cls, db_path: str) -> None:
+        """Use a different database file. Cached connections are reopened on next use."""
+        cls.db_path = db_path
+        cls._generation += 1
+
+    @classmethod
+    def get_path(cls) -> str:
+        return cls.db_path
+
+    @classmethod
+    def connect(cls, db_path: str = None) -> sqlite3.Connection:
+        """Open a new, uncached connection with the shared pragmas applied."""
+        conn = sqlite3.connect(db_path or cls.db_path, cached_statements=cls.cached_statements)
+        for pragma, value in cls.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    @classmethod
+    def get(cls) -> sqlite3.Connection:
+        """Return this thread's cached connection, opening it if needed."""
+        #a connection must not be reused after a fork or a change of database path
+        key = (os.getpid(), cls._generation)
+        conn = getattr(cls._local, "conn", None)
+        if conn is not None and cls._local.key != key:
+            if cls._local.key[0] == key[0]:
+                conn.close()
+            conn = None
+        if conn is None:
+            conn = cls.connect()
+            cls._local.conn = conn
+            cls._local.key = key
+        return conn
+
+    @classmethod
+    def close(cls) -> None:
+        """Close this thread's cached connection."""
+        conn = getattr(cls._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            cls._local.conn = None
@@ -1,17 +1,19 @@
 import sys
 import re
+import time
+import numpy as np
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout,
     QHBoxLayout, QGridLayout, QStackedLayout, QFormLayout, QLineEdit,
-    QMessageBox, QSizePolicy, QScrollArea, QInputDialog
+    QMessageBox, QSizePolicy, QScrollArea, QInputDialog, QProgressBar
 )
-from PySide6.QtCore import QTimer, Qt
+from PySide6.QtCore import QTimer, Qt, QThread, Signal
 from PySide6.QtGui import QIntValidator, QFont
-import sqlite3
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib import style
 from matplotlib.figure import Figure
 from Stock import Stock
+from TradingSimulator import TradingSimulator
 from TradingStrategiesWidget import TradingStrategiesWidget
 
 class loadingWindow(QWidget):
@@ -82,8 +84,8 @@ class startWindow(QWidget):
         self.exitButton.clicked.connect(QApplication.quit)
 
     def displaySimDetailsFunc(self, sim_id):
-        """Display the simulation details window."""
-        if self.simulator.too_many_simulations():
+        """Display the simulation details window, of a new simulation if sim_id is None."""
+        if sim_id is None and self.simulator.too_many_simulations():
             QMessageBox.warning(self, "Too Many Simulations", "You have too many simulations in the database. Please delete some before starting a new one.")
             return
         self.display_sim_details_obj = displaySimulation(self, sim_id)
@@ -133,9 +135,12 @@ class displaySimulation(QWidget):
 
         #Stock tabel: name, performannce, value
         stock_grid = QGridLayout()
+        self.stock_fields = {} #{ticker: (performance, value, owned)} fields refreshed after each run
+        watchlist = self.simulator.get_watchlist()
+        rows = (len(watchlist) + 1) // 2 #watchlist split over two columns
 
-        for i in range(10):
-            Stock = self.get_stock(i)
+        for i, ticker in enumerate(watchlist):
+            Stock = self.simulator.get_stock(ticker)
 
             stock_name = Stock.get_name()
             stock_button = QPushButton(stock_name)
@@ -167,27 +172,43 @@ class displaySimulation(QWidget):
             display_stocks_owned.setReadOnly(True)
             display_stocks_owned.setText(str(stocks_owned))
             stock_numbers.addRow("OWNED:", display_stocks_owned)
+            self.stock_fields[ticker] = (display_stock_performance, display_stock_value, display_stocks_owned)
             
-            if(i<5):
+            if(i<rows):
                 stock_grid.addLayout(stock_numbers,i,0)
                 stock_grid.addWidget(stock_button,i,1)
             
             else:
-                stock_grid.addLayout(stock_numbers,(i-5),2)
-                stock_grid.addWidget(stock_button,(i-5),3)
+                stock_grid.addLayout(stock_numbers,(i-rows),2)
+                stock_grid.addWidget(stock_button,(i-rows),3)
                 
-        #stylise the grid by making it into a widget
-        stock_info_widget = QWidget()
+        #stylise the grid by making it into a widget, scrolling when the watchlist is long
+        self.stock_info_widget = stock_info_widget = QWidget()
         stock_info_widget.setLayout(stock_grid)
         stock_info_widget.setStyleSheet("background-color: #333333; color: white;")
-        stock_info_widget.setMinimumSize(800, 500)
-        stock_info_widget.setMaximumSize(800, 700)
+        stock_info_widget.setMinimumSize(780, 100 * rows)
+        stock_scroll = QScrollArea()
+        stock_scroll.setWidget(stock_info_widget)
+        stock_scroll.setWidgetResizable(True)
+        stock_scroll.setMinimumSize(800, 500)
+        stock_scroll.setMaximumSize(800, 700)
+
+        #watchlist: comma separated tickers from the universe to show above
+        self.watchlist_input = QLineEdit()
+        self.watchlist_input.setText(", ".join(watchlist))
+        self.watchlist_button = QPushButton("UPDATE WATCHLIST")
+        self.watchlist_button.clicked.connect(self.update_watchlist)
+        watchlist_layout = QHBoxLayout()
+        watchlist_layout.addWidget(QLabel("WATCHLIST:"))
+        watchlist_layout.addWidget(self.watchlist_input)
+        watchlist_layout.addWidget(self.watchlist_button)
 
         #display balances and stocks on the LHS
         left_panel = QVBoxLayout()
         left_panel.addLayout(balance_layout)
         #left_panel.addLayout(stock_grid)
-        left_panel.addWidget(stock_info_widget)
+        left_panel.addWidget(stock_scroll)
+        left_panel.addLayout(watchlist_layout)
 
         #Invested balance, portforlio performance
         self.invested_label = QLabel("PORTFOLIO VALUE: $" + str(round(portfolio_value,2)))
@@ -198,8 +219,8 @@ class displaySimulation(QWidget):
         portfolio_layout.addWidget(self.portfolio_performance_label)
 
         #simulation graph
-        graph_widget = graphWidget(self.simulator, None)
-        graph_widget.plot_graph()
+        self.graph_widget = graphWidget(self.simulator, None)
+        self.graph_widget.plot_graph()
         
         #time input
         self.days_input = QLineEdit()
@@ -209,17 +230,28 @@ class displaySimulation(QWidget):
         time_layout = QFormLayout()
         time_layout.addRow("ENTER RUN TIME (DAYS): ", self.days_input)
 
+        #progress of a running simulation, with the time left once it can be estimated
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v / %m DAYS")
+        self.progress_label = QLabel("")
+        self.progress_bar.hide()
+        time_layout.addRow(self.progress_bar)
+        time_layout.addRow(self.progress_label)
+
         #display balance, performance, graph and time input on the RHS
         right_panel = QVBoxLayout()
         right_panel.addLayout(portfolio_layout)
-        right_panel.addWidget(graph_widget)
+        right_panel.addWidget(self.graph_widget)
         right_panel.addLayout(time_layout)
 
         #run/end simulation
         self.run_button = QPushButton("RUN SIMULATION")
+        self.cancel_button = QPushButton("CANCEL RUN")
+        self.cancel_button.hide()
         self.end_button = QPushButton("END SIMULATION")
         button_layout = QVBoxLayout()
         button_layout.addWidget(self.run_button)
+        button_layout.addWidget(self.cancel_button)
         button_layout.addWidget(self.end_button)
 
         #final layout
@@ -234,6 +266,8 @@ class displaySimulation(QWidget):
 
         #button actions
         self.run_button.clicked.connect(self.run_sim)
+        self.cancel_button.clicked.connect(self.cancel_sim)
+        self.worker = None #simulationWorker of the latest run, kept until its thread has finished
         self.end_button.clicked.connect(lambda: self.startWindow.backToStartWindow(self))
 
     @staticmethod
@@ -272,11 +306,20 @@ class displaySimulation(QWidget):
          
 
     def get_stock(self, index: int) -> Stock: 
-        """Get stock object by index."""
-        ticker = self.simulator.get_tickers()[index]
+        """Get stock object by its index in the watchlist."""
+        ticker = self.simulator.get_watchlist()[index]
         Stock = self.simulator.get_stock(ticker)
         return Stock   
 
+    def update_watchlist(self):
+        """Show the tickers typed into the watchlist input."""
+        try:
+            self.simulator.set_watchlist(self.watchlist_input.text().split(","))
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid watchlist", str(e))
+            return
+        self.reloadSimWindow()
+
     def displayStockFunc(self, Stock):
         """Display stock details in a new window."""
         self.stock_display = displayStock(self, self.simulator, Stock)
@@ -284,12 +327,84 @@ class displaySimulation(QWidget):
         self.close()
 
     def run_sim(self):
-        """Run the simulation for a specified number of days."""
+        """Run the simulation for a specified number of days on a worker thread, so the window stays responsive."""
         days = self.get_days_input()
         if 0 < days < 10000:
-            self.simulator.set_timeframe(days)
-            self.simulator.run_simulation()
-            self.reloadSimWindow()
+            if self.worker is not None:
+                self.worker.wait() #the previous run's thread returns right after its last signal
+            self.set_running(True)
+            self.worker = simulationWorker(self.simulator, days)
+            self.worker.progress.connect(self.show_progress)
+            self.worker.run_finished.connect(self.sim_finished)
+            self.worker.failed.connect(self.sim_failed)
+            self.worker.start()
+
+    def cancel_sim(self):
+        """Stop the running simulation after the days it is working on."""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.progress_label.setText("CANCELLING...")
+
+    def show_progress(self, days_done: int, total_days: int, seconds_left: float):
+        self.progress_bar.setMaximum(total_days)
+        self.progress_bar.setValue(days_done)
+        if seconds_left >= 0:
+            self.progress_label.setText(f"ABOUT {int(seconds_left) + 1}s LEFT")
+
+    def sim_finished(self, completed: bool):
+        """Show the results of a finished (or cancelled) run."""
+        self.set_running(False)
+        if not completed:
+            self.progress_label.setText(f"RUN CANCELLED, SIMULATION ENDS ON {self.simulator.end_date}")
+        self.refresh_values()
+        self.graph_widget.plot_graph() #adds only the days just simulated
+
+    def sim_failed(self, message: str):
+        self.set_running(False)
+        QMessageBox.warning(self, "Simulation failed", message)
+        self.refresh_values()
+        self.graph_widget.plot_graph()
+
+    def set_running(self, running: bool):
+        """Swap the run button for the progress bar and cancel button while a run is in progress.
+        Everything that reads or changes the simulator is disabled until the run ends."""
+        self.run_button.setEnabled(not running)
+        self.end_button.setEnabled(not running)
+        self.days_input.setEnabled(not running)
+        self.stock_info_widget.setEnabled(not running)
+        self.watchlist_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.cancel_button.setVisible(running)
+        self.progress_bar.setVisible(running)
+        if running:
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("")
+
+    def closeEvent(self, event):
+        #never leave a run writing to the database behind a closed window
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
+
+    def refresh_values(self):
+        """Update the balances and watchlist fields in place after a run."""
+        cash_balance = self.simulator.balance.getCurrentBalance()
+        portfolio_value = self.simulator.balance.getPortfolioValue()
+        portfolio_performance = self.simulator.balance.getPortfolioPerformance()
+        self.total_balance_label.setText("TOTAL BALANCE: $" + str(round(cash_balance + portfolio_value,2)))
+        self.cash_balance_label.setText("CASH BALANCE: $" + str(round(cash_balance,2)))
+        self.invested_label.setText("PORTFOLIO VALUE: $" + str(round(portfolio_value,2)))
+        self.portfolio_performance_label.setText("PERFORMANCE: "+ str(round(portfolio_performance,1)) +"%")
+
+        for ticker, (display_stock_performance, display_stock_value, display_stocks_owned) in self.stock_fields.items():
+            Stock = self.simulator.get_stock(ticker)
+            display_stock_performance.setText(str(round(Stock.get_current_stock_performance(),1)) + "%")
+            stock_value = round(Stock.get_current_stock_value(),2)
+            self.style_textEdit("green" if stock_value <= cash_balance else "red", display_stock_value)
+            display_stock_value.setText("$" + str(stock_value))
+            display_stocks_owned.setText(str(Stock.get_number_stocks()))
 
     def get_days_input(self) -> int:
         """Get the number of days input from the user."""
@@ -309,6 +424,41 @@ class displaySimulation(QWidget):
         self.close()
        
 
+class simulationWorker(QThread):
+    """Runs TradingSimulator.run_simulation off the GUI thread. Progress, the result and errors come
+    back through signals, which Qt delivers on the GUI thread, so only slots there touch the widgets."""
+    progress = Signal(int, int, float) #days done, total days, estimated seconds left (-1 until known)
+    run_finished = Signal(bool) #True if the run completed, False if it was cancelled
+    failed = Signal(str)
+
+    def __init__(self, simulator, days: int):
+        super().__init__()
+        self.simulator = simulator
+        self.days = days
+
+    def run(self):
+        started = time.perf_counter()
+        def report(days_done, total_days):
+            elapsed = time.perf_counter() - started
+            seconds_left = elapsed * (total_days - days_done) / days_done if days_done else -1.0
+            self.progress.emit(days_done, total_days, seconds_left)
+
+        self.simulator.progress_callback = report
+        try:
+            self.simulator.set_timeframe(self.days)
+            completed = self.simulator.run_simulation()
+        except Exception as e:
+            #any error ends the run, the window is unlocked again by the failed signal
+            self.failed.emit(str(e))
+            return
+        finally:
+            self.simulator.progress_callback = None
+        self.run_finished.emit(completed)
+
+    def cancel(self):
+        self.simulator.cancel()
+
+
 class displayStock(QWidget):
     def __init__(self, simWindow, simulator, Stock):
         super().__init__()
@@ -612,6 +762,8 @@ class tradeWidget(QWidget):
 
 
 class displaySims(QWidget):
+    page_size = 50 #simulations shown per page, only the shown page's widgets are created
+
     def __init__(self, startWindow):
         super().__init__()
         self.startWindow = startWindow
@@ -619,32 +771,22 @@ class displaySims(QWidget):
         self.setWindowTitle("Previous Simulations")
 
         vlayout = QVBoxLayout()
-        sim_layout = QGridLayout()
-        #loop through all the simulations and display their names
-        self.sim_IDS = self.get_sim_IDS()
-        i = 0
-        for sim_id in self.sim_IDS:
-            sim_num_label = QLabel(f"{i+1}")
-            sim_num_label.setFixedSize(20,40)
-            sim_layout.addWidget(sim_num_label,i,0)
-
-            prev_sim_button = QPushButton(sim_id)
-            prev_sim_button.setFixedSize(200, 40)
-            prev_sim_button.clicked.connect(lambda checked=False, id=sim_id: self.displayPrevSimFunc(id))
-            sim_layout.addWidget(prev_sim_button,i,1)
-
-            edit_name_button = QPushButton("EDIT NAME")
-            edit_name_button.setFixedSize(100, 40)
-            edit_name_button.clicked.connect(lambda checked=False, id=sim_id: self.editSimNameFunc(id))
-            sim_layout.addWidget(edit_name_button,i,2)
-
-            delete_sim = QPushButton("DELETE SIM")
-            delete_sim.setFixedSize(100, 40)
-            delete_sim.clicked.connect(lambda checked=False, id=sim_id: self.delete_simulation(id))
-            sim_layout.addWidget(delete_sim, i,3)
-
-            i += 1
-        vlayout.addLayout(sim_layout)
+        #rows of the current page, filled in by show_page
+        self.sim_layout = QGridLayout()
+        self.sim_widgets = []
+        vlayout.addLayout(self.sim_layout)
+
+        #page navigation
+        self.prev_button = QPushButton("< PREVIOUS")
+        self.prev_button.clicked.connect(lambda: self.show_page(self.page - 1))
+        self.next_button = QPushButton("NEXT >")
+        self.next_button.clicked.connect(lambda: self.show_page(self.page + 1))
+        self.page_label = QLabel("")
+        page_layout = QHBoxLayout()
+        page_layout.addWidget(self.prev_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_button)
+        vlayout.addLayout(page_layout)
 
         #back button
         back_button = QPushButton("GO BACK")
@@ -660,34 +802,65 @@ class displaySims(QWidget):
         container_widget = QWidget()
         container_widget.setLayout(main_layout)
 
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setWidget(container_widget)
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setWidget(container_widget)
 
         final_layout = QVBoxLayout()
-        final_layout.addWidget(scroll_area)
+        final_layout.addWidget(self.scroll_area)
         self.setLayout(final_layout)
 
-    def get_sim_IDS(self):
-        """Fetch simulation IDs from the database."""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
+        self.page = 0
+        self.show_page(0)
+
+    def show_page(self, page: int):
+        """Show one page of simulations, from their summaries in the simulations table."""
+        sim_count = self.startWindow.simulator.count_simulations()
+        pages = max(1, -(-sim_count // self.page_size))
+        self.page = min(max(page, 0), pages - 1)
+
+        #widgets of the previous page are dropped, only this page's are created
+        for widget in self.sim_widgets:
+            self.sim_layout.removeWidget(widget)
+            widget.deleteLater()
+        self.sim_widgets = []
+
+        offset = self.page * self.page_size
+        summaries = self.startWindow.simulator.get_simulation_summaries(self.page_size, offset)
+        for i, summary in enumerate(summaries):
+            sim_id = summary["sim_id"]
+            sim_num_label = QLabel(f"{offset + i + 1}")
+            sim_num_label.setFixedSize(40,40)
+
+            prev_sim_button = QPushButton(summary["name"])
+            prev_sim_button.setFixedSize(200, 40)
+            prev_sim_button.clicked.connect(lambda checked=False, id=sim_id: self.displayPrevSimFunc(id))
 
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        sims = cursor.fetchall()
+            #dates and result of the simulation so far
+            if summary["final_value"] is None:
+                details = f"CREATED {summary['created'] or '-'}, NOT RUN YET"
+            else:
+                details = (f"{summary['start_date']} TO {summary['end_date']}   "
+                           f"VALUE: ${round(summary['final_value'],2)}   RETURN: {round(summary['return_pct'],1)}%")
+            details_label = QLabel(details)
+            details_label.setMinimumWidth(420)
 
-        sim_names = []
-        for sim in sims:
-            sim_names.append(sim[0])
+            edit_name_button = QPushButton("EDIT NAME")
+            edit_name_button.setFixedSize(100, 40)
+            edit_name_button.clicked.connect(lambda checked=False, id=sim_id: self.editSimNameFunc(id))
 
-        #remove historical data table
-        if "historicalData" in sim_names:
-            sim_names.remove("historicalData")
-        if "sqlite_sequence" in sim_names:
-            sim_names.remove("sqlite_sequence")
-        
-        conn.close()
-        return sim_names
+            delete_sim = QPushButton("DELETE SIM")
+            delete_sim.setFixedSize(100, 40)
+            delete_sim.clicked.connect(lambda checked=False, id=sim_id: self.delete_simulation(id))
+
+            for column, widget in enumerate((sim_num_label, prev_sim_button, details_label, edit_name_button, delete_sim)):
+                self.sim_layout.addWidget(widget, i, column)
+                self.sim_widgets.append(widget)
+
+        self.page_label.setText(f"PAGE {self.page + 1} OF {pages} ({sim_count} SIMULATIONS)")
+        self.prev_button.setEnabled(self.page > 0)
+        self.next_button.setEnabled(self.page < pages - 1)
+        self.scroll_area.verticalScrollBar().setValue(0)
     
     def editSimNameFunc(self, sim_id):
         """Edit the selected simulation name."""
@@ -722,10 +895,8 @@ class displaySims(QWidget):
         self.close()
 
     def reloadDisplaySims(self):
-        """Reload the displaySims window to reflect changes."""
-        new_window = displaySims(self.startWindow)
-        new_window.show()
-        self.close()
+        """Show the current page again to reflect changes."""
+        self.show_page(self.page)
 
 
 class graphWidget(QWidget):
@@ -735,53 +906,90 @@ class graphWidget(QWidget):
         self.Stock = Stock
 
         self.type = "STOCK"
+        self.balance_type = "VALUE OF INVESTMENT"
         if self.Stock is None:
             self.type = "SIMULATION"
+            self.balance_type = "VALUE OF PORTFOLIO"
+        self.max_points = 1000 #long simulations are downsampled to this many points
+
+        #what has been plotted so far, so refreshes only fetch the rows recorded since
+        self.last_entry = None
+        self.last_date = None
+        self.last_day = 0
+
+        # Set graph style (applies to figures created after this)
+        style.use("seaborn-v0_8-darkgrid")
+        #style.use("dark_background")
 
         self.figure = Figure(figsize=(5, 5), dpi=100)
         self.canvas = FigureCanvas(self.figure)
         self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(self.type + " PERFORMANCE", fontsize=14, fontweight='bold')
+        self.ax.set_xlabel("DAY", fontsize=12)
+        self.ax.set_ylabel(self.balance_type, fontsize=12)
+        self.ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
+        self.line, = self.ax.plot([], [], marker='.', linestyle='-', color="#1f77b4", linewidth=2, markersize=4)
 
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
         self.setLayout(layout)
 
-    def plot_graph(self):
-        """Plot graph data on specified graph."""
+    def get_graph_data(self, after_entry=None) -> dict:
         if self.type == "SIMULATION":
-            balance_type = "VALUE OF PORTFOLIO"
-            data = self.simulator.get_sim_graph_data()
+            return self.simulator.get_sim_graph_data(self.max_points, after_entry)
         elif self.type == "STOCK":
-            balance_type = "VALUE OF INVESTMENT"
-            data = self.simulator.get_stock_graph_data(self.Stock)
+            return self.simulator.get_stock_graph_data(self.Stock, self.max_points, after_entry)
         else: 
             raise ValueError(f"type: {self.type} is invalid when initialising graphWidget. 'SIMULATION' or 'STOCK' only")
 
-        day_data = data["days"]
-        balance_data = data["balances"]
+    def plot_graph(self):
+        """Plot graph data on specified graph. Once something is plotted, only new rows are added."""
+        if self.last_entry is not None:
+            self.update_graph()
+            return
 
-        # Set graph style
-        style.use("seaborn-v0_8-darkgrid")
-        #style.use("dark_background")
+        data = self.get_graph_data()
+        # If no data is available yet, leave the graph empty
+        if data.get("last_entry") is None:
+            self.canvas.draw_idle()
+            return
 
-        # If no data is available, clear the graph and set titles
-        if day_data == [0] and balance_data == [0]:
-            self.ax.clear()
-            self.ax.set_title(self.type + " PERFORMANCE")
-            self.ax.set_xlabel("DAY")
-            self.ax.set_ylabel(balance_type)
-            self.canvas.draw()
+        self.last_entry = data["last_entry"]
+        self.last_date = data["last_date"]
+        self.last_day = data["days"][-1]
+        self.set_line(np.array(data["days"]), np.array(data["balances"]))
+
+    def update_graph(self):
+        """Append the days recorded since the last refresh to the plotted line."""
+        data = self.get_graph_data(self.last_entry)
+        if len(data["days"]) == 0:
             return
 
-        self.ax.clear()  # Clear previous plots
-        self.ax.plot(day_data, balance_data, marker='.', linestyle='-', color="#1f77b4", linewidth=2, markersize=4)
+        days = np.array(self.line.get_xdata(), dtype=float)
+        balances = np.array(self.line.get_ydata(), dtype=float)
+        offset = self.last_day
+        #rows recorded on the last plotted date (e.g. a trade) replace that date's point
+        if data["first_date"] == self.last_date:
+            days, balances = days[:-1], balances[:-1]
+            offset -= 1
+        days = np.concatenate((days, np.array(data["days"]) + offset))
+        balances = np.concatenate((balances, data["balances"]))
+        #the line only ever holds a bounded number of points, however long the simulation runs
+        if len(days) > 2 * self.max_points:
+            days, balances = TradingSimulator.downsample(days, balances, self.max_points)
+
+        self.last_entry = data["last_entry"]
+        self.last_date = data["last_date"]
+        self.last_day = int(days[-1])
+        self.set_line(days, balances)
+
+    def set_line(self, days, balances):
+        self.line.set_data(days, balances)
+        self.line.set_marker('.' if len(days) <= 250 else None) #markers only while individual days can be told apart
+        self.ax.relim()
+        self.ax.autoscale_view()
         self.ax.set_ylim(bottom=0) #makes it so the y axis can only start at 0
-        self.ax.set_title(self.type + " PERFORMANCE", fontsize=14, fontweight='bold')
-        self.ax.set_xlabel("DAY", fontsize=12)
-        self.ax.set_ylabel(balance_type, fontsize=12)
-        self.ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
-
-        self.canvas.draw()
+        self.canvas.draw_idle() #redrawn once Qt is idle, however many updates come in before then
         
 
             
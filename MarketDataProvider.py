@@ -0,0 +1,71 @@
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+class MarketDataProvider(ABC):
+    """
+    Source of daily price history for the Database.
+    Subclasses implement download(), which returns a DataFrame indexed by date with
+    Open, High, Low and Close columns (or None/an empty frame if the ticker has no data).
+    A subclass without download() cannot be created.
+    """
+    @abstractmethod
+    def download(self, ticker: str):
+        """Full daily price history of one ticker."""
+
+    def downloadAll(self, tickers: list[str], maxWorkers: int = 8) -> dict:
+        """Download every ticker once, concurrently on a bounded pool of worker threads.
+        Returns {ticker: DataFrame}; tickers without data are left out."""
+        with ThreadPoolExecutor(max_workers=max(1, maxWorkers)) as pool:
+            frames = dict(zip(tickers, pool.map(self.download, tickers)))
+        return {ticker: frame for ticker, frame in frames.items() if frame is not None and not frame.empty}
+
+    @staticmethod
+    def normalise(frame):
+        """Flatten yfinance style column levels and drop time zones so frames compare on plain dates."""
+        import pandas as pd  # only needed when refreshing, keeps warm starts fast
+        if frame is None or frame.empty:
+            return frame
+        frame = frame.copy()
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = frame.columns.get_level_values(0)
+        frame.index = pd.DatetimeIndex(frame.index)
+        if frame.index.tz is not None:
+            frame.index = frame.index.tz_localize(None)
+        return frame.sort_index()
+
+    @staticmethod
+    def sliceDates(frame, startDate=None, endDate=None):
+        """Rows from startDate (inclusive) up to endDate (exclusive), matching yfinance's start/end."""
+        import pandas as pd
+        if startDate is not None:
+            frame = frame[frame.index >= pd.Timestamp(str(startDate))]
+        if endDate is not None:
+            frame = frame[frame.index < pd.Timestamp(str(endDate))]
+        return frame
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Full price history from Yahoo Finance."""
+    def download(self, ticker: str):
+        import yfinance
+        #Ticker.history is safe to call from several threads, unlike yfinance.download
+        data = yfinance.Ticker(ticker).history(period="max")
+        return self.normalise(data)
+
+
+class CSVProvider(MarketDataProvider):
+    """
+    Local file-backed provider for offline use and tests.
+    Reads <directory>/<TICKER>.csv files with Date, Open, High, Low and Close columns.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def download(self, ticker: str):
+        path = os.path.join(self.directory, f"{ticker}.csv")
+        if not os.path.exists(path):
+            return None
+        import pandas as pd
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+        return self.normalise(data)
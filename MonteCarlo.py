@@ -0,0 +1,120 @@
+import copy
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from DatabaseConnection import DatabaseConnection
+from ParameterSweep import ParameterSweep
+from PriceStore import PriceStore
+from TradingCalendar import TradingCalendar
+from TradingStrategies import TradingStrategies
+from VectorEngine import VectorEngine
+
+logger = logging.getLogger(__name__)
+
+#batch rebuilt once per worker process by the pool initializer, from the database rather than a pickled copy
+_worker_batch = None
+
+def _init_worker(db_path: str, settings: dict) -> None:
+    global _worker_batch
+    DatabaseConnection.set_path(db_path)
+    strategies = TradingStrategies(None)
+    strategies.stock_strategies = settings.pop("stock_strategies")
+    _worker_batch = MonteCarlo(strategies=strategies, **settings)
+
+def _run_chunk(start_rows: list) -> list[tuple]:
+    return [_worker_batch.run_one(row) for row in start_rows]
+
+class MonteCarlo:
+    """
+    Batch of simulations with the same trades and strategies from randomly sampled start dates,
+    to show how much a strategy's result depends on when it starts.
+    Runs never wrap around the end of the data: start dates are only sampled where the whole
+    timeframe fits in the price history.
+    Usage:
+    1. Create with the tickers, the timeframe in days, the strategies, starting balance and shares bought
+       on the start date (or from_simulator() to copy them from a TradingSimulator)
+    2. Call run() with the number of simulations and a seed
+    """
+    percentiles = (5, 25, 50, 75, 95)
+    metric_names = ("final_value", "return_pct", "max_drawdown_pct")
+
+    def __init__(self, tickers, days: int, strategies: TradingStrategies = None,
+                 start_balance: float = 10000.0, initial_shares: dict = None):
+        if days <= 0:
+            raise ValueError("insufficient number of days in timeframe. must be at least 1")
+        self.tickers = list(tickers)
+        self.days = int(days)
+        self.start_balance = float(start_balance)
+        self.initial_shares = dict(initial_shares or {})
+        self.strategies = TradingStrategies(None)
+        if strategies is not None:
+            self.strategies.stock_strategies = copy.deepcopy(strategies.stock_strategies)
+
+        #whole history from the first date every ticker has a price on, loaded once for all runs
+        store = PriceStore.shared()
+        calendar = TradingCalendar.shared()
+        first_date = max(str(store.get_series(ticker)["date"][0]) for ticker in self.tickers)
+        self.dates = calendar.range(first_date, calendar.get_end_date())
+        self.opens, _ = VectorEngine(self.tickers).load_prices(self.dates)
+
+        #a run covers start_date to start_date + days (inclusive), like TradingSimulator.set_timeframe
+        days_array = np.asarray(self.dates, dtype="datetime64[D]")
+        run_ends = days_array + np.timedelta64(self.days, "D")
+        self.end_rows = np.searchsorted(days_array, run_ends, side="right")
+        self.start_rows = np.flatnonzero(run_ends <= days_array[-1])
+        if not len(self.start_rows):
+            raise ValueError(f"No start date leaves {self.days} days of historical data")
+
+    def settings(self) -> dict:
+        """Arguments that recreate this batch, plain values only, for worker processes."""
+        return {"tickers": self.tickers, "days": self.days, "stock_strategies": self.strategies.stock_strategies,
+                "start_balance": self.start_balance, "initial_shares": self.initial_shares}
+
+    @classmethod
+    def from_simulator(cls, simulator, days: int = None) -> "MonteCarlo":
+        """Batch with a simulator's stocks, strategies, starting balance and current holdings."""
+        shares = {ticker: stock.get_number_stocks() for ticker, stock in simulator.stocks.items()}
+        return cls(simulator.stocks.keys(), days or simulator.current_timeframe_in_days, simulator.strategies,
+                   simulator.balance.getStartBalance(), shares)
+
+    def run_one(self, start_row: int) -> tuple:
+        """Final value, return and maximum drawdown of the run starting on the given row."""
+        opens = self.opens[start_row:self.end_rows[start_row]]
+        state = ParameterSweep.starting_state(self.tickers, opens[0], self.start_balance, self.initial_shares)
+        results = VectorEngine(self.tickers).simulate(opens, state, self.strategies)
+        metrics = ParameterSweep.metrics(results, self.start_balance)
+        return tuple(metrics[name] for name in self.metric_names)
+
+    def run(self, simulations: int, seed: int = None, workers: int = None, chunk_size: int = None) -> dict:
+        """
+        Run the given number of simulations from start dates sampled with a seeded generator
+        (the same seed always gives the same batch), spread over a pool of worker processes.
+        Only three numbers per run are kept, so memory does not grow with the length of the runs.
+        Returns the "start_dates", arrays of every metric and their "percentiles".
+        """
+        rng = np.random.default_rng(seed)
+        start_rows = rng.choice(self.start_rows, size=simulations).tolist()
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or simulations <= 1:
+            processes = 1
+            rows = [self.run_one(row) for row in start_rows]
+        else:
+            chunk_size = chunk_size or max(1, math.ceil(simulations / (workers * 4)))
+            chunks = [start_rows[i:i + chunk_size] for i in range(0, simulations, chunk_size)]
+            processes = min(workers, len(chunks))
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(DatabaseConnection.get_path(), self.settings())) as pool:
+                rows = [row for chunk in pool.map(_run_chunk, chunks) for row in chunk]
+        logger.info("Ran %d simulations of %d days on %d processes", len(rows), self.days, processes)
+
+        values = np.array(rows, dtype=float).reshape(-1, len(self.metric_names))
+        results = {"start_dates": [self.dates[row] for row in start_rows]}
+        results["percentiles"] = {}
+        for column, name in enumerate(self.metric_names):
+            results[name] = values[:, column]
+            if len(values):
+                results["percentiles"][name] = dict(zip(self.percentiles, np.percentile(values[:, column], self.percentiles).tolist()))
+        return results
@@ -0,0 +1,163 @@
+import itertools
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from DatabaseConnection import DatabaseConnection
+from TradingCalendar import TradingCalendar
+from TradingStrategies import TradingStrategies
+from VectorEngine import VectorEngine
+
+logger = logging.getLogger(__name__)
+
+#sweep rebuilt once per worker process by the pool initializer, from the database rather than a pickled copy
+_worker_sweep = None
+
+def _init_worker(db_path: str, settings: dict) -> None:
+    global _worker_sweep
+    DatabaseConnection.set_path(db_path)
+    _worker_sweep = ParameterSweep(**settings)
+
+def _run_chunk(combinations: list) -> list[dict]:
+    return [_worker_sweep.backtest(combination) for combination in combinations]
+
+class ParameterSweep:
+    """
+    Headless backtests of many strategy configurations over the same dates, without the GUI or
+    the simulation tables. Opening prices are loaded once per process (each worker process loads
+    them from the database when it starts), each combination is then an independent run of VectorEngine.simulate.
+    Usage:
+    1. Create with the tickers, a date range, the starting balance and any shares bought on the first date
+    2. Call grid() to expand lists of parameter values into combinations (or build them yourself)
+    3. Call run() with the combinations to get a result table ranked by final value
+    """
+    def __init__(self, tickers, start_date, end_date, start_balance: float = 10000.0, initial_shares: dict = None):
+        self.tickers = list(tickers)
+        self.dates = TradingCalendar.shared().range(start_date, end_date)
+        if not self.dates:
+            raise ValueError(f"No trading dates found between {start_date} and {end_date}")
+        self.start_balance = float(start_balance)
+        self.initial_shares = dict(initial_shares or {})
+        self.opens, _ = VectorEngine(self.tickers).load_prices(self.dates)
+        self.state = self.starting_state(self.tickers, self.opens[0], self.start_balance, self.initial_shares)
+
+    def settings(self) -> dict:
+        """Arguments that recreate this sweep, plain values only, for worker processes."""
+        return {"tickers": self.tickers, "start_date": self.dates[0], "end_date": self.dates[-1],
+                "start_balance": self.start_balance, "initial_shares": self.initial_shares}
+
+    @staticmethod
+    def starting_state(tickers, opening_values, start_balance: float, initial_shares: dict) -> dict:
+        """Fresh balance and stocks with the initial shares bought at the opening values,
+        the same way Balance.purchase does, in the form VectorEngine.simulate takes."""
+        cash = float(start_balance)
+        invested = 0.0
+        cash_profit = 0.0
+        portfolio_value = 0.0
+        shares = [0] * len(tickers)
+        cash_invested = [0.0] * len(tickers)
+        investment_values = [0.0] * len(tickers)
+        for column, ticker in enumerate(tickers):
+            amount = int(initial_shares.get(ticker, 0))
+            if amount <= 0:
+                continue
+            value = float(opening_values[column])
+            price = value * amount
+            if cash < price:
+                raise ValueError(f"Insufficient balance to buy {amount} shares of {ticker}")
+            cash -= price
+            invested += price
+            cash_invested[column] = price
+            cash_profit -= price
+            shares[column] = amount
+            investment_values[column] = amount * value
+            portfolio_value += investment_values[column]
+        return {
+            "cash": cash,
+            "total_invested": invested,
+            "total_cash_profit": cash_profit,
+            "portfolio_value": portfolio_value,
+            "shares": shares,
+            "cash_invested": cash_invested,
+            "cash_withdrawn": [0.0] * len(tickers),
+            "opening_values": np.array(opening_values, dtype=float),
+            "investment_values": investment_values,
+        }
+
+    @staticmethod
+    def metrics(results: dict, start_balance: float) -> dict:
+        """Final value, return, total cash profit, maximum drawdown and trade count of a simulate() result."""
+        #balance plus portfolio value at the end of each date
+        total_value = results["current_balance"][:, -1] + results["portfolio_value"][:, -1]
+        peak = np.maximum.accumulate(total_value)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(peak > 0, (peak - total_value) / peak, 0.0)
+        final_value = float(total_value[-1])
+        return {
+            "final_value": final_value,
+            "return_pct": (final_value - start_balance) / start_balance * 100 if start_balance > 0 else 0.0,
+            "total_cash_profit": results["final_state"]["total_cash_profit"],
+            "max_drawdown_pct": float(drawdown.max()) * 100,
+            "trades": int(np.count_nonzero(results["sell_quantity"]) + np.count_nonzero(results["buy_quantity"])),
+        }
+
+    @staticmethod
+    def grid(options: dict) -> list[dict]:
+        """
+        Every combination of the parameter values in options,
+        e.g. {"AAPL": {"take_profit": {"threshold": [0.1, 0.2]}, "dollar_cost_avg": {"shares": [1, 5], "interval": [7]}}}.
+        Each combination is a {ticker: {strategy_name: {param: value}}} dict.
+        """
+        keys = []
+        values = []
+        for ticker, strategies in options.items():
+            for strategy_name, params in strategies.items():
+                if not params:
+                    params = {"active": [True]}  # strategy with its default settings
+                for param, param_values in params.items():
+                    keys.append((ticker, strategy_name, param))
+                    values.append(list(param_values))
+
+        combinations = []
+        for chosen in itertools.product(*values):
+            combination = {}
+            for (ticker, strategy_name, param), value in zip(keys, chosen):
+                combination.setdefault(ticker, {}).setdefault(strategy_name, {})[param] = value
+            combinations.append(combination)
+        return combinations
+
+    def backtest(self, combination: dict) -> dict:
+        """Run one combination of strategies and work out its metrics."""
+        strategies = TradingStrategies(None)
+        for ticker, configs in combination.items():
+            for strategy_name, params in configs.items():
+                strategies.activate(ticker, strategy_name, **{k: v for k, v in params.items() if k != "active"})
+        results = VectorEngine(self.tickers).simulate(self.opens, self.state, strategies)
+        return {"strategies": combination, **self.metrics(results, self.start_balance)}
+
+    def run(self, combinations: list, workers: int = None, chunk_size: int = None) -> list[dict]:
+        """
+        Backtest every combination, spread over a pool of worker processes (one per core by default,
+        workers=1 runs in this process). Returns one row per combination, best final value first.
+        """
+        combinations = list(combinations)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(combinations) <= 1:
+            processes = 1
+            rows = [self.backtest(combination) for combination in combinations]
+        else:
+            #a few chunks per worker keeps every core busy without sending each combination on its own
+            chunk_size = chunk_size or max(1, math.ceil(len(combinations) / (workers * 4)))
+            chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+            processes = min(workers, len(chunks))
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(DatabaseConnection.get_path(), self.settings())) as pool:
+                rows = [row for chunk in pool.map(_run_chunk, chunks) for row in chunk]
+        logger.info("Ran %d backtests on %d processes", len(rows), processes)
+
+        rows.sort(key=lambda row: row["final_value"], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+        return rows
@@ -0,0 +1,90 @@
+import numpy as np
+
+class PortfolioState:
+    """
+    Per stock state of a portfolio held as NumPy arrays with one slot per ticker, so the state of
+    every ticker can be read or updated at once. Stock objects are views over one slot
+    (see PortfolioField), so code working one stock at a time keeps using the Stock getters and setters.
+    Usage:
+    1. Create with the tickers (or add() them, add_many() grows the arrays once for a whole universe)
+    2. Read or write a field for all tickers through its array, e.g. state.number_stocks[state.slot("AAPL")]
+    """
+    float_fields = ("opening_stock_value", "opening_stock_performance", "cash_invested", "cash_withdrawn",
+                    "cash_profit", "investment_value", "current_stock_value", "current_stock_performance",
+                    "investment_performance")
+    int_fields = ("number_stocks",)
+
+    def __init__(self, tickers=()):
+        self.tickers = []
+        self.slots = {}  # {ticker: position in the arrays}
+        self.views = {}  # {field: memoryview of the field's array}, for fast single slot access
+        for field in self.float_fields:
+            setattr(self, field, np.zeros(0))
+        for field in self.int_fields:
+            setattr(self, field, np.zeros(0, dtype=np.int64))
+        self.add_many(tickers)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def add(self, ticker: str) -> int:
+        """Slot of a ticker, adding a zeroed slot at the end if it does not have one yet."""
+        return self.add_many([ticker])[0]
+
+    def add_many(self, tickers) -> list[int]:
+        """Slots of many tickers, adding zeroed slots for the new ones with a single resize of each array."""
+        new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.slots]
+        if not new:
+            return [self.slots[ticker] for ticker in tickers]
+        for field in self.float_fields + self.int_fields:
+            values = getattr(self, field)
+            setattr(self, field, np.concatenate((values, np.zeros(len(new), dtype=values.dtype))))
+        for ticker in new:
+            self.slots[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        self.update_views()
+        return [self.slots[ticker] for ticker in tickers]
+
+    def update_views(self) -> None:
+        """Point the memoryviews at the current arrays (adding a ticker replaces them)."""
+        self.views = {field: memoryview(getattr(self, field)) for field in self.float_fields + self.int_fields}
+
+    def slot(self, ticker: str) -> int:
+        if ticker not in self.slots:
+            raise ValueError(f"Stock {ticker} not found in portfolio")
+        return self.slots[ticker]
+
+    def get_slots(self, tickers) -> np.ndarray:
+        return np.array([self.slot(ticker) for ticker in tickers], dtype=np.int64)
+
+    def daily_update(self, values, performance, slots=None) -> None:
+        """Stock.dailyStockUpdate for many tickers at once: set the current value and performance
+        and recalculate cash profit, investment value and investment performance."""
+        slots = slice(None) if slots is None else slots
+        self.current_stock_value[slots] = values
+        self.current_stock_performance[slots] = performance
+        cash_invested = self.cash_invested[slots]
+        self.cash_profit[slots] = self.cash_withdrawn[slots] - cash_invested
+        self.investment_value[slots] = self.number_stocks[slots] * self.current_stock_value[slots]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            performance = ((self.investment_value[slots] + self.cash_profit[slots]) / cash_invested) * 100
+        self.investment_performance[slots] = np.where(cash_invested == 0, 0.0, performance)
+
+class PortfolioField:
+    """Stock attribute stored in the stock's slot of its PortfolioState.
+    Goes through a memoryview of the array, which reads and writes plain Python numbers.
+    Values are converted to the field's type on the way in. None is kept as NaN in float fields
+    (and read back as None) and as 0 in int fields."""
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.convert = int if name in PortfolioState.int_fields else float
+        self.missing = 0 if name in PortfolioState.int_fields else float("nan")
+
+    def __get__(self, stock, owner=None):
+        if stock is None:
+            return self
+        value = stock.portfolio.views[self.name][stock.slot]
+        return None if value != value else value  # NaN only comes from None
+
+    def __set__(self, stock, value):
+        stock.portfolio.views[self.name][stock.slot] = self.missing if value is None else self.convert(value)
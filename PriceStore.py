@@ -0,0 +1,260 @@
+import threading
+from datetime import datetime, date
+
+import numpy as np
+from DatabaseConnection import DatabaseConnection
+
+class PriceStore:
+    """
+    In-memory copy of the historicalData table.
+    Each ticker is held as sorted NumPy arrays of dates and OHLC values so that
+    price lookups are a bisect over an array instead of a new database query.
+    """
+    _shared = None
+    _lock = threading.Lock()
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or DatabaseConnection.get_path()
+        self.series = {}  # {ticker: {"date": array, "open": array, "high": array, "low": array, "close": array}}
+        self.start_date = None
+        self.end_date = None
+        self.date_index = {}  # {ticker: {date: position in the ticker's arrays}}, built on demand
+        self.rolling_performance = {}  # {(ticker, window): performance array aligned with the ticker's dates}
+        self.calendar = None  # TradingCalendar of all dates, built on demand
+        self.all_dates = None  # sorted array of every distinct date, built on demand
+        self.matrices = {}  # {(tickers, field): date x ticker array aligned with all_dates}
+        self.restart_dates = {}  # {(end date, ticker, band step, minimum matches): restart date}
+
+    @classmethod
+    def shared(cls) -> "PriceStore":
+        """Return the process wide store, loading it from the database on first use."""
+        with cls._lock:
+            if cls._shared is None or cls._shared.db_path != DatabaseConnection.get_path():
+                store = cls()
+                store.load()
+                cls._shared = store
+            return cls._shared
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the shared store so the next lookup reloads it (call after ingesting new rows)."""
+        with cls._lock:
+            cls._shared = None
+
+    def load(self) -> None:
+        """Read the whole historicalData table into per-ticker arrays."""
+        conn = DatabaseConnection.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT stock_ticker, date, open, high, low, close
+            FROM historicalData
+            ORDER BY stock_ticker, date
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        self.series = {}
+        self.start_date = None
+        self.end_date = None
+        self.date_index = {}
+        self.rolling_performance = {}
+        self.calendar = None
+        self.all_dates = None
+        self.matrices = {}
+        self.restart_dates = {}
+        if not rows:
+            return
+
+        tickers, dates, opens, highs, lows, closes = zip(*rows)
+        tickers = np.array(tickers)
+        dates = np.array(dates)
+        prices = {
+            "open": np.array(opens, dtype=float),
+            "high": np.array(highs, dtype=float),
+            "low": np.array(lows, dtype=float),
+            "close": np.array(closes, dtype=float),
+        }
+
+        #split the sorted rows into one block per ticker
+        boundaries = np.flatnonzero(tickers[1:] != tickers[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(tickers)]))
+        for start, end in zip(starts, ends):
+            series = {"date": dates[start:end]}
+            for field, values in prices.items():
+                series[field] = values[start:end]
+            self.series[str(tickers[start])] = series
+
+        self.start_date = min(str(series["date"][0]) for series in self.series.values())
+        self.end_date = max(str(series["date"][-1]) for series in self.series.values())
+
+    @staticmethod
+    def to_key(value) -> str:
+        """Convert a date to the text form sqlite would compare it as."""
+        if isinstance(value, datetime):
+            return value.isoformat(" ")
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    #lookups
+    def get_tickers(self) -> list[str]:
+        return list(self.series.keys())
+
+    def get_series(self, ticker: str) -> dict:
+        if ticker not in self.series:
+            raise ValueError(f"No historical data found for ticker {ticker}")
+        return self.series[ticker]
+
+    def get_start_and_end_dates(self) -> tuple[str, str]:
+        if self.start_date is None or self.end_date is None:
+            raise ValueError(f"No valid dates found in historical data")
+        return self.start_date, self.end_date
+
+    def get_dates(self, ticker: str, start_date, end_date) -> list[str]:
+        """All dates for a ticker between start_date and end_date (inclusive)."""
+        series = self.series.get(ticker)
+        if series is None:
+            return []
+        dates = series["date"]
+        first = np.searchsorted(dates, self.to_key(start_date), side="left")
+        last = np.searchsorted(dates, self.to_key(end_date), side="right")
+        return dates[first:last].tolist()
+
+    def get_value(self, ticker: str, date, field: str = "open") -> float:
+        """
+        Value of a field on the given date.
+        If the exact date is not available, the closest previous date's value is returned.
+        """
+        series = self.series.get(ticker)
+        key = self.to_key(date)
+        if series is not None:
+            index = np.searchsorted(series["date"], key, side="right") - 1
+            if index >= 0:
+                return float(series[field][index])
+        raise ValueError(f"No data found for {ticker} before {key}")
+
+    def get_performance(self, ticker: str, start_date, end_date) -> float:
+        """Percentage change from the first open to the last close between two dates.
+        Falls back to the first date in the database if the window holds no data."""
+        series = self.series.get(ticker)
+        start_key = self.to_key(start_date)
+        end_key = self.to_key(end_date)
+        dates = series["date"] if series is not None else np.array([], dtype=str)
+        first = np.searchsorted(dates, start_key, side="left")
+        last = np.searchsorted(dates, end_key, side="right")
+        if first >= last:
+            start_key = self.get_start_and_end_dates()[0]
+            first = np.searchsorted(dates, start_key, side="left")
+        if first >= last:
+            raise ValueError(f"No historical data found for {ticker} between {start_key} and {end_key}")
+
+        opening_value = float(series["open"][first])
+        closing_value = float(series["close"][last - 1])
+        if opening_value == 0:
+            return 0.0
+        return ((closing_value - opening_value) / opening_value) * 100.0
+
+    def get_date_index(self, ticker: str) -> dict:
+        """{date: position} for a ticker's dates, for O(1) exact date lookups."""
+        if ticker not in self.date_index:
+            dates = self.series[ticker]["date"].tolist() if ticker in self.series else []
+            self.date_index[ticker] = {day: i for i, day in enumerate(dates)}
+        return self.date_index[ticker]
+
+    def get_performance_index(self, ticker: str, window: int) -> np.ndarray:
+        """
+        Performance over the last `window` calendar days for every date of a ticker,
+        computed once for the whole history with array operations and then cached.
+        """
+        key = (ticker, window)
+        if key not in self.rolling_performance:
+            series = self.get_series(ticker)
+            days = series["date"].astype("datetime64[D]")
+            first = np.searchsorted(days, days - np.timedelta64(window, "D"), side="left")
+            opening_values = series["open"][first]
+            closing_values = series["close"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                performance = ((closing_values - opening_values) / opening_values) * 100.0
+            self.rolling_performance[key] = np.where(opening_values == 0, 0.0, performance)
+        return self.rolling_performance[key]
+
+    def get_rolling_performance(self, ticker: str, window: int, todays_date):
+        """Precomputed performance for a trading date of the ticker, or None if the date is not one."""
+        index = self.get_date_index(ticker).get(self.to_key(todays_date))
+        if index is None:
+            return None
+        return float(self.get_performance_index(ticker, window)[index])
+
+    def get_all_dates(self) -> np.ndarray:
+        """Every distinct date across all tickers, sorted."""
+        if self.all_dates is None:
+            dates = [series["date"] for series in self.series.values()]
+            self.all_dates = np.unique(np.concatenate(dates)) if dates else np.array([], dtype=str)
+        return self.all_dates
+
+    def get_matrix(self, tickers, field: str = "open") -> np.ndarray:
+        """
+        Date x ticker array of a field, one row per date in get_all_dates() and one column per ticker.
+        Dates a ticker has no data for are NaN.
+        """
+        key = (tuple(tickers), field)
+        if key not in self.matrices:
+            all_dates = self.get_all_dates()
+            matrix = np.full((len(all_dates), len(key[0])), np.nan)
+            for column, ticker in enumerate(key[0]):
+                series = self.get_series(ticker)
+                rows = np.searchsorted(all_dates, series["date"])
+                matrix[rows, column] = series[field]
+            self.matrices[key] = matrix
+        return self.matrices[key]
+
+    def get_performance_matrix(self, tickers, window: int) -> np.ndarray:
+        """Date x ticker array of get_performance_index() values, aligned with get_all_dates().
+        Dates a ticker has no data for are NaN."""
+        key = (tuple(tickers), ("performance", window))
+        if key not in self.matrices:
+            all_dates = self.get_all_dates()
+            matrix = np.full((len(all_dates), len(key[0])), np.nan)
+            for column, ticker in enumerate(key[0]):
+                rows = np.searchsorted(all_dates, self.get_series(ticker)["date"])
+                matrix[rows, column] = self.get_performance_index(ticker, window)
+            self.matrices[key] = matrix
+        return self.matrices[key]
+
+    def get_restart_date(self, ticker, end_date, band_step: float = 0.05, min_matches: int = 10) -> str:
+        """
+        Earliest date before end_date on which ticker opened within a band around its opening
+        value on end_date. The band starts at band_step and widens by band_step until at least
+        min_matches dates qualify. Cached per (end date, ticker).
+        """
+        key = (self.to_key(end_date), ticker, band_step, min_matches)
+        if key in self.restart_dates:
+            return self.restart_dates[key]
+
+        all_dates = self.get_all_dates()
+        before_end = int(np.searchsorted(all_dates, key[0], side="left"))
+        opens = self.get_matrix([ticker], "open")[:before_end, 0]
+        final_open = self.get_value(ticker, end_date, "open")
+        #dates where the ticker has no price never qualify
+        dates = all_dates[:before_end][~np.isnan(opens)]
+        opens = opens[~np.isnan(opens)]
+        if len(opens) < min_matches:
+            raise ValueError(f"Fewer than {min_matches} dates found before {key[0]}")
+
+        #widths the band takes, added up one step at a time like a running total would be
+        steps = int(np.max(np.abs(opens / final_open - 1)) / band_step) + 2
+        bands = np.cumsum(np.full(steps, band_step))
+
+        #for every price, the first band step that contains it (bounds grow/shrink monotonically with the band)
+        above = np.searchsorted(final_open * (1 + bands), opens, side="left")
+        below = len(bands) - np.searchsorted((final_open * (1 - bands))[::-1], opens, side="right")
+        first_step = np.maximum(above, below)
+
+        #the band stops widening at the min_matches'th date
+        band = np.partition(first_step, min_matches - 1)[min_matches - 1]
+        restart_date = str(dates[int(np.argmax(first_step <= band))])
+
+        self.restart_dates[key] = restart_date
+        return restart_date
@@ -0,0 +1,179 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+
+from Database import Database
+from TradingCalendar import TradingCalendar
+from TradingSimulator import TradingSimulator
+
+class SimulationRunner:
+    """
+    Runs a simulation from a config, without the GUI, console prompts or prints, and returns
+    the results as a JSON ready dict. Used by the command line entry point at the bottom of this file.
+    Config keys (all optional):
+        start_date      first date of the simulation (random if not given)
+        start_balance   cash to start with (10000)
+        days            timeframe in days (30)
+        trades          {ticker: shares} bought (or sold if negative) on the start date
+        strategies      {ticker: {strategy_name: {param: value}}}
+        engine          "vector" (default) or "legacy"
+        save            keep the simulation in the database afterwards (True)
+    """
+    defaults = {
+        "start_date": None,
+        "start_balance": 10000.0,
+        "days": 30,
+        "trades": {},
+        "strategies": {},
+        "engine": "vector",
+        "save": True,
+    }
+
+    def __init__(self, config: dict = None):
+        unknown = set(config or {}) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        self.config = {**self.defaults, **(config or {})}
+        if self.config["engine"] not in ("vector", "legacy"):
+            raise ValueError(f"Unknown engine {self.config['engine']}, use 'vector' or 'legacy'")
+        if int(self.config["days"]) <= 0:
+            raise ValueError("insufficient number of days in timeframe. must be at least 1")
+        if self.config["start_date"] is not None:
+            TradingCalendar.to_date(self.config["start_date"])
+
+    @staticmethod
+    def load_config(path: str) -> dict:
+        with open(path) as file:
+            return json.load(file)
+
+    def run(self, log=None) -> dict:
+        """Run the simulation to completion. Progress messages go to log (discarded if None)."""
+        with contextlib.redirect_stdout(log or io.StringIO()):
+            return self._run()
+
+    def _run(self) -> dict:
+        config = self.config
+        database = Database()
+        database.refreshPolicy = "manual"  # never download in the middle of a scripted run
+        simulator = TradingSimulator(float(config["start_balance"]), database=database)
+        simulator.engine = config["engine"]
+        simulator.new_simulation(config["start_date"])
+        start_date = str(simulator.start_date)
+
+        try:
+            for ticker, amount in config["trades"].items():
+                if not simulator.trade_a_stock(ticker, int(amount)):
+                    raise ValueError(f"Could not trade {amount} shares of {ticker}")
+            for ticker, strategies in config["strategies"].items():
+                simulator.get_stock(ticker)  # unknown tickers raise
+                for strategy_name, params in strategies.items():
+                    simulator.strategies.activate(ticker, strategy_name, **(params or {}))
+
+            started = time.perf_counter()
+            simulator.set_timeframe(int(config["days"]))
+            simulator.run_simulation()
+            elapsed = time.perf_counter() - started
+        except Exception:
+            #a failed run leaves nothing behind in the database
+            simulator.delete_simulation(simulator.get_sim_id())
+            raise
+
+        balance = simulator.balance
+        results = {
+            "sim_id": simulator.get_sim_id() if config["save"] else None,
+            "start_date": start_date,
+            "end_date": str(simulator.end_date),
+            "days": int(config["days"]),
+            "engine": config["engine"],
+            "start_balance": balance.getStartBalance(),
+            "current_balance": balance.getCurrentBalance(),
+            "total_invested_balance": balance.getTotalInvestedBalance(),
+            "total_cash_profit": balance.getTotalCashProfit(),
+            "portfolio_value": balance.getPortfolioValue(),
+            "portfolio_performance": balance.getPortfolioPerformance(),
+            "total_value": simulator.get_total_value(),
+            "stocks": {
+                ticker: {
+                    "number_of_stocks": stock.get_number_stocks(),
+                    "investment_value": stock.get_investment_value(),
+                    "cash_invested": stock.get_cash_invested(),
+                    "cash_withdrawn": stock.get_cash_withdrawn(),
+                }
+                for ticker, stock in simulator.stocks.items()
+            },
+            "elapsed_seconds": elapsed,
+        }
+        if not config["save"]:
+            simulator.delete_simulation(simulator.get_sim_id())
+        return results
+
+def parse_value(text: str):
+    """Strategy parameter from the command line: a JSON number/boolean, otherwise the text itself."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+def parse_args(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Run a trading simulation without the GUI and print the results as JSON.")
+    parser.add_argument("--config", help="JSON file with any of the config keys, arguments override it")
+    parser.add_argument("--start-date", help="first date of the simulation, YYYY-MM-DD (random if not given)")
+    parser.add_argument("--start-balance", type=float)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--trade", action="append", default=[], metavar="TICKER=SHARES",
+                        help="shares bought (negative: sold) on the start date, repeatable")
+    parser.add_argument("--strategy", action="append", default=[], metavar="TICKER:STRATEGY[:PARAM=VALUE,...]",
+                        help="e.g. AAPL:take_profit:threshold=0.2, repeatable")
+    parser.add_argument("--engine", choices=["vector", "legacy"])
+    parser.add_argument("--no-save", action="store_true", help="delete the simulation from the database afterwards")
+    parser.add_argument("--output", help="write the JSON here instead of standard output")
+    parser.add_argument("--verbose", action="store_true", help="show simulation progress on standard error")
+    args = parser.parse_args(argv)
+
+    config = SimulationRunner.load_config(args.config) if args.config else {}
+    if args.start_date is not None:
+        config["start_date"] = args.start_date
+    if args.start_balance is not None:
+        config["start_balance"] = args.start_balance
+    if args.days is not None:
+        config["days"] = args.days
+    if args.engine is not None:
+        config["engine"] = args.engine
+    if args.no_save:
+        config["save"] = False
+    for trade in args.trade:
+        ticker, _, amount = trade.partition("=")
+        if not amount.lstrip("-").isdigit():
+            parser.error(f"--trade must look like TICKER=SHARES, got {trade}")
+        config.setdefault("trades", {})[ticker] = int(amount)
+    for strategy in args.strategy:
+        ticker, _, rest = strategy.partition(":")
+        strategy_name, _, params = rest.partition(":")
+        if not strategy_name:
+            parser.error(f"--strategy must look like TICKER:STRATEGY[:PARAM=VALUE,...], got {strategy}")
+        config.setdefault("strategies", {}).setdefault(ticker, {})[strategy_name] = {
+            param: parse_value(value) for param, _, value in (pair.partition("=") for pair in params.split(",") if pair)
+        }
+    return {"config": config, "output": args.output, "verbose": args.verbose}
+
+def main(argv=None) -> int:
+    options = parse_args(argv)
+    try:
+        results = SimulationRunner(options["config"]).run(sys.stderr if options["verbose"] else None)
+        status = 0
+    except (ValueError, TypeError) as error:
+        results = {"error": str(error)}
+        status = 1
+    text = json.dumps(results, indent=2)
+    if options["output"]:
+        with open(options["output"], "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,33 @@
-import sqlite3
 from datetime import datetime, timedelta, date
+from PriceStore import PriceStore
+from PortfolioState import PortfolioState, PortfolioField
 
 class Stock:
-    def __init__(self, name: str, ticker: str, opening_value: float, opening_performance: float):
+    """
+    One stock of the portfolio. The numeric state lives in the stock's slot of a PortfolioState
+    (shared by every stock of a simulation), this object is a view over that slot.
+    """
+    performance_window = 30 #days of history used for stock performance
+
+    #state held in the PortfolioState arrays
+    opening_stock_value = PortfolioField()
+    opening_stock_performance = PortfolioField()
+    number_stocks = PortfolioField()
+    cash_invested = PortfolioField()
+    cash_withdrawn = PortfolioField()
+    cash_profit = PortfolioField()
+    investment_value = PortfolioField()
+    current_stock_value = PortfolioField()
+    current_stock_performance = PortfolioField()
+    investment_performance = PortfolioField()
+
+    def __init__(self, name: str, ticker: str, opening_value: float, opening_performance: float,
+                 portfolio: PortfolioState = None):
         #static instance variables
         self.name = name 
         self.ticker = ticker
+        self.portfolio = portfolio if portfolio is not None else PortfolioState()
+        self.slot = self.portfolio.add(ticker)
         self.opening_stock_value: float = opening_value
         self.opening_stock_performance: float = opening_performance
         
@@ -35,6 +57,11 @@ class Stock:
         )
 
 
+    def to_dict(self) -> dict:
+        """name, ticker and every value held in the stock's slot"""
+        fields = PortfolioState.float_fields + PortfolioState.int_fields
+        return {"name": self.name, "ticker": self.ticker, **{field: getattr(self, field) for field in fields}}
+
     # Getters
     def get_name(self) -> str:
         return self.name
@@ -101,7 +128,7 @@ class Stock:
 
         self.opening_stock_value = self.fetchOpeningValue(self.ticker, date)
         self.current_stock_value = self.opening_stock_value
-        self.opening_stock_performance = self.fetchStockPerformance(self.ticker, 30, date)
+        self.opening_stock_performance = self.fetchStockPerformance(self.ticker, Stock.performance_window, date)
         self.current_stock_performance = self.opening_stock_performance   
 
     def update_cash_profit(self):
@@ -134,61 +161,34 @@ class Stock:
     def dailyStockUpdate(self, date) -> None:
         #update the current value and performance of the stock based on the date
         self.current_stock_value = Stock.fetchOpeningValue(self.ticker, date)
-        self.current_stock_performance = Stock.fetchStockPerformance(self.ticker, 30, date)
+        self.current_stock_performance = Stock.fetchStockPerformance(self.ticker, Stock.performance_window, date)
         self.update_cash_profit()
         self.update_investment_value()
         self.update_investment_performance()
 
-    def set_stock_from_simulation(self, simulation_id) -> None:
-        """Set the stock instance variables based on last entry in simulation data."""
-        with sqlite3.connect("data.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-                SELECT cash_invested, cash_withdrawn, investment_value, investment_performance, current_stock_performance, number_of_stocks
-                FROM {simulation_id}
-                WHERE ticker = ?
-                ORDER BY entry_number DESC
-                LIMIT 1
-            """, (self.ticker,))
-            data = cursor.fetchone()
-
-        if not data:
-            raise ValueError(f"No simulation data found for ID: {simulation_id} on last entry for ticker: {self.ticker}")
-
-        # Set instance variables
-        self.cash_invested = data[0]
-        self.cash_withdrawn = data[1]
+    def set_stock_from_simulation(self, row: dict, end_date) -> None:
+        """Set the stock instance variables from its latest row in a simulation's snapshot,
+        valued on the simulation's last date."""
+        self.cash_invested = row["cash_invested"]
+        self.cash_withdrawn = row["cash_withdrawn"]
         self.update_cash_profit()
-        self.investment_value = data[2]
-        self.investment_performance = data[3]
-        self.current_stock_performance = data[4]
-        self.number_stocks = data[5]
+        self.investment_value = row["investment_value"]
+        self.investment_performance = row["investment_performance"]
+        self.current_stock_performance = row["current_stock_performance"]
+        self.number_stocks = row["number_of_stocks"]
 
         # Set value-based fields
-        start_date, end_date = self.get_sim_start_and_end_dates(simulation_id)
-        self.opening_stock_value = self.fetchOpeningValue(self.ticker, start_date)
+        self.opening_stock_value = self.fetchOpeningValue(self.ticker, row["start_date"])
         self.current_stock_value = self.fetchOpeningValue(self.ticker, end_date)
-        self.opening_stock_performance = self.fetchStockPerformance(self.ticker, 30, start_date)
+        self.opening_stock_performance = self.fetchStockPerformance(self.ticker, Stock.performance_window, row["start_date"])
 
 
     #static methods for fetching historical data (and sim data) from the database
+    #historical lookups are served from the in-memory PriceStore rather than per-call queries
     @staticmethod
     def fetchDates(startDate, endDate, ticker: str) -> list[str]:
         """Get all available dates for a stock (for simulation time range)."""
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT date 
-            FROM historicalData 
-            WHERE stock_ticker = ? AND date BETWEEN ? AND ?
-            ORDER BY date
-        """, (ticker, startDate, endDate))
-        
-        dates = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return dates
+        return PriceStore.shared().get_dates(ticker, startDate, endDate)
 
     @staticmethod
     def approximateValue(ticker: str, date: str, openOrClose: str) -> float:
@@ -196,25 +196,8 @@ class Stock:
         Fetch the opening value for a stock on a given date.
         If the exact date is not available, it returns the closest previous date's opening value.
         """
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT open, close 
-            FROM historicalData 
-            WHERE stock_ticker = ? AND date <= ?
-            ORDER BY date DESC
-        """, (ticker, date))
-
-        data = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        if not data:
-            raise ValueError(f"No data found for {ticker} before {date}")
-
-        # Return the requested value based on openOrClose parameter
-        return data[0] if openOrClose.lower() == "open" else data[1]
+        field = "open" if openOrClose.lower() == "open" else "close"
+        return PriceStore.shared().get_value(ticker, date, field)
 
     @staticmethod
     def fetchStockPerformance(ticker: str, timeframe: int, todays_date) -> float:
@@ -233,106 +216,27 @@ class Stock:
         else:
             raise TypeError("Date must be a string or datetime or date object.")
         
-        #if the start date is before the first date in the database, set it to the first date
-        if not Stock.fetchDates(startDate, todays_date, ticker):
-            startDate = Stock.get_historical_start_and_end_dates()[0]
-        
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT open, close 
-            FROM historicalData 
-            WHERE stock_ticker = ? AND date BETWEEN ? AND ?
-            ORDER BY date
-        """, (ticker, startDate, todays_date))
-        
-        data = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not data:
-            raise ValueError(f"No historical data found for {ticker} between {startDate} and {todays_date}")
-
-        opening_value = data[0][0]
-        closing_value = data[-1][1] 
-
-        if opening_value == 0:
-            return 0.0
-        return ((closing_value - opening_value) / opening_value) * 100.0
+        #trading dates are answered from the precomputed rolling index, other dates by searching the window
+        #(if the start date is before the first date in the database, the store falls back to the first date)
+        store = PriceStore.shared()
+        performance = store.get_rolling_performance(ticker, timeframe, todays_date)
+        if performance is None:
+            performance = store.get_performance(ticker, startDate, todays_date)
+        return performance
 
     @staticmethod
     def fetchOpeningValue(ticker: str, date) -> float:
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT open
-            FROM historicalData 
-            WHERE stock_ticker = ? AND date = ?
-        """, (ticker, date))
-        data = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if not data:
-            return Stock.approximateValue(ticker, date, "open")
-        return data[0]
+        return PriceStore.shared().get_value(ticker, date, "open")
     
     @staticmethod
     def fetchClosingValue(ticker: str, date) -> float:
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT close
-            FROM historicalData 
-            WHERE stock_ticker = ? AND date = ?
-        """, (ticker, date))
-        data = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if not data:
-            return Stock.approximateValue(ticker, date, "close")
-        return data[0]
+        return PriceStore.shared().get_value(ticker, date, "close")
 
     @staticmethod
     def get_historical_start_and_end_dates() -> tuple[str, str]:
         """Fetch the start and end dates from the historical data ."""
-        conn = sqlite3.connect("data.db")
-        cursor = conn.cursor()
-        cursor.execute(f"""         
-            SELECT MIN(date), MAX(date)
-            FROM historicalData
-        """)
-        dates = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if not dates or not all(dates):
-            raise ValueError(f"No valid dates found in historical data")
-        
-        return dates[0], dates[1]
-
-    @staticmethod
-    def get_sim_start_and_end_dates(simulation_id) -> tuple[str,str]:
-        """Fetch the start and end dates from simulation data"""
-        with sqlite3.connect("data.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-                SELECT date
-                FROM {simulation_id}
-                WHERE entry_number = (SELECT MIN(entry_number) FROM {simulation_id})
-            """)
-            start_date = cursor.fetchone()[0]
-        
-        with sqlite3.connect("data.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-                SELECT date
-                FROM {simulation_id}
-                WHERE entry_number = (SELECT MAX(entry_number) FROM {simulation_id})
-            """)
-            end_date = cursor.fetchone()[0]
+        return PriceStore.shared().get_start_and_end_dates()
 
-        return (start_date, end_date)
 
         
         
\ No newline at end of file
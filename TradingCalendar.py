@@ -0,0 +1,83 @@
+from datetime import datetime, date
+
+import numpy as np
+from PriceStore import PriceStore
+
+class TradingCalendar:
+    """
+    Every distinct trading date in the historical data, built once from the price store.
+    Holds a sorted array of dates plus a {date: index} map, so moving around the calendar
+    (next/previous trading day, date ranges, existence checks) needs no SQL.
+    """
+    def __init__(self, dates):
+        self.dates = np.unique(np.asarray(list(dates), dtype=str))
+        self.date_list = self.dates.tolist()
+        self.positions = {day: i for i, day in enumerate(self.date_list)}
+
+    @classmethod
+    def shared(cls) -> "TradingCalendar":
+        """Calendar of the shared price store (rebuilt whenever the store is reloaded)."""
+        store = PriceStore.shared()
+        if store.calendar is None:
+            store.calendar = cls(store.get_all_dates())
+        return store.calendar
+
+    @staticmethod
+    def to_date(value) -> date:
+        """Convert a date string, datetime or date to a date object."""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            return date.fromisoformat(value[:10])
+        raise TypeError("date must be a string, datetime, or date")
+
+    def __len__(self) -> int:
+        return len(self.date_list)
+
+    def get_start_date(self) -> str:
+        return self.date_list[0] if self.date_list else None
+
+    def get_end_date(self) -> str:
+        return self.date_list[-1] if self.date_list else None
+
+    def exists(self, day) -> bool:
+        return PriceStore.to_key(day) in self.positions
+
+    def index(self, day) -> int:
+        """Position of a trading date in the calendar."""
+        key = PriceStore.to_key(day)
+        if key not in self.positions:
+            raise ValueError(f"{key} is not a trading date")
+        return self.positions[key]
+
+    def next(self, day):
+        """First trading date after the given date, or None."""
+        key = PriceStore.to_key(day)
+        position = self.positions.get(key)
+        if position is None:
+            position = int(np.searchsorted(self.dates, key, side="right")) - 1
+        position += 1
+        return self.date_list[position] if position < len(self.date_list) else None
+
+    def previous(self, day):
+        """Last trading date before the given date, or None."""
+        key = PriceStore.to_key(day)
+        position = self.positions.get(key)
+        if position is None:
+            position = int(np.searchsorted(self.dates, key, side="left"))
+        position -= 1
+        return self.date_list[position] if position >= 0 else None
+
+    def on_or_after(self, day):
+        """The given date if it is a trading date, otherwise the next one (or None)."""
+        key = PriceStore.to_key(day)
+        position = int(np.searchsorted(self.dates, key, side="left"))
+        return self.date_list[position] if position < len(self.date_list) else None
+
+    def range(self, start_date, end_date) -> list[str]:
+        """All trading dates between start_date and end_date (inclusive)."""
+        first = int(np.searchsorted(self.dates, PriceStore.to_key(start_date), side="left"))
+        last = int(np.searchsorted(self.dates, PriceStore.to_key(end_date), side="right"))
+        return self.date_list[first:last]
@@ -1,11 +1,16 @@
-import sqlite3
+from DatabaseConnection import DatabaseConnection
 from typing import Dict, List
 from datetime import datetime, timedelta, date
 
 import random
+import numpy as np
 from Stock import Stock
 from Balance import Balance
 from Database import Database
+from TradingCalendar import TradingCalendar
+from PriceStore import PriceStore
+from PortfolioState import PortfolioState
+from VectorEngine import VectorEngine
 import TradingStrategies as TradingStrategies
 from TradingStrategies import TradingStrategies
 import re
@@ -67,19 +72,13 @@ class TradingSimulator:
         #find the restart loop date and historical data end date
         restart_loop_date = self.get_loop_restart_date()
         historical_data_end_date = self.database.getEndDate() 
-
-        #convert dates to datetime.date objects if they are strings or datetime objects
-        if isinstance(restart_loop_date, str):
-            restart_loop_date = datetime.strptime(restart_loop_date, "%Y-%m-%d").date()
-        if isinstance(restart_loop_date, datetime):
-            restart_loop_date = restart_loop_date.date()
-        if isinstance(historical_data_end_date, str):
-            historical_data_end_date = datetime.strptime(historical_data_end_date, "%Y-%m-%d").date()   
-        if isinstance(historical_data_end_date, datetime):
-            historical_data_end_date = historical_data_end_date.date()  
         if restart_loop_date is None or historical_data_end_date is None:
             raise ValueError("Restart loop date or historical data end date is not set correctly.")        
 
+        #convert dates to datetime.date objects if they are strings or datetime objects
+        restart_loop_date = TradingCalendar.to_date(restart_loop_date)
+        historical_data_end_date = TradingCalendar.to_date(historical_data_end_date)
+
         #calculate the number of days between the restart loop date and historical data end date
         loop_days = (historical_data_end_date - restart_loop_date).days + 1  # +1 to include end date
 
@@ -93,21 +92,14 @@ class TradingSimulator:
 
     def get_previous_trading_day(self, date) -> str:
         """Find the most recent trading day before given date"""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT MAX(date) FROM historicalData 
-            WHERE date < ?
-        """, (date))
-        result = cursor.fetchone()[0]
-        conn.close()
+        result = TradingCalendar.shared().previous(date)
         return result if result else date  # Fallback to same date if no previous found
 
 
     # 1 initialisation
-    def __init__(self, start_balance: float = 10000):
+    def __init__(self, start_balance: float = 10000, database: Database = None):
         """Initialise simulation with balance and stocks"""
-        self.database = Database()
+        self.database = database or Database()
         self.database.initialiseDatabase()
 
         #default start and end dates match the database dates
@@ -119,10 +111,23 @@ class TradingSimulator:
         self.balance = Balance(start_balance)
         self.strategies = TradingStrategies(self.balance)
         
-        self.stocks: Dict[str, Stock] = {}  # {ticker: Stock}
+        self.portfolio = PortfolioState() #per stock state, one array slot per ticker
+        self.stocks: Dict[str, Stock] = {}  # {ticker: Stock}, views over the portfolio slots
         self.create_stocks()
+        self.watchlist = self.get_tickers()[:10] #tickers shown in the GUI, see set_watchlist
 
         self.current_simulation_id = None
+        self.transaction_buffer = [] #rows waiting to be written to the simulation table
+        self.loop_number = 0 #times the recorded rows went back to the loop restart date, stored with every row
+        self.last_recorded_date = None #date of the latest recorded row, an earlier date starts a new loop
+        self.flush_interval_days = 250 #write buffered rows every N simulated days (0 = end of run only)
+        self.engine = "legacy" #"legacy" steps through every date and stock, "vector" uses VectorEngine
+        self.progress_callback = None #called with (days done, total days) while run_simulation runs
+        self.progress_interval_days = 25 #dates between progress reports/cancel checks in the day by day loop
+                                         #(the vector engine checks after every flush_interval_days dates)
+        self.progress_total_days = 0
+        self.cancel_requested = False #set by cancel(), possibly from another thread
+        self.max_simulations = 10000 #stored simulations before new ones are refused (None = no limit)
       
 
         self.current_timeframe_in_days = 0
@@ -132,17 +137,20 @@ class TradingSimulator:
         
     def create_stocks(self) -> None:
         """Create Stock objects for all tickers in database"""
-        for ticker in self.database.getTickers():
+        tickers = self.database.getTickers()
+        self.portfolio.add_many(tickers) #one slot per ticker, allocated up front
+        for ticker in tickers:
             # Get opening price from simulation start date
             value = Stock.fetchOpeningValue(ticker, self.start_date)
-            performance = Stock.fetchStockPerformance(ticker, 30, self.start_date)
+            performance = Stock.fetchStockPerformance(ticker, Stock.performance_window, self.start_date)
             self.stocks[ticker] = Stock(
                 name = self.database.getStockName(ticker),
                 ticker = ticker,
                 opening_value = value,
-                opening_performance = performance
+                opening_performance = performance,
+                portfolio = self.portfolio
             )
-            print("Stock created:" + self.stocks[ticker].get_name())
+        print(f"Created {len(self.stocks)} stocks")
 
 
     #1.5 getter methods
@@ -156,6 +164,19 @@ class TradingSimulator:
             raise ValueError(f"Stock {ticker} not found in portfolio")
         return self.stocks[ticker]
     
+    def get_watchlist(self) -> List[str]:
+        """Get the tickers shown in the GUI"""
+        return self.watchlist
+
+    def set_watchlist(self, tickers: List[str]) -> None:
+        """Choose which tickers the GUI shows, every ticker must be in the universe"""
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+        for ticker in tickers:
+            self.get_stock(ticker)  # unknown tickers raise
+        if not tickers:
+            raise ValueError("Watchlist must contain at least one ticker")
+        self.watchlist = tickers
+
     def get_sim_id(self) -> str:
         """Get current simulation ID"""
         if not self.current_simulation_id:
@@ -164,12 +185,17 @@ class TradingSimulator:
 
 
     # 2.1 cofiguration - new: sim name, table start date and reset stocks
-    def new_simulation(self) -> None:
-        """Initialize a new simulation with valid ID"""
+    def new_simulation(self, start_date=None) -> None:
+        """Initialize a new simulation with valid ID, from start_date or a random start date"""
         simulation_id = self.generate_simulation_id()
         self.current_simulation_id = simulation_id
-        self.create_simulation_table()  # Must be called before run!
-        self.randomiseStartDate()
+        self.loop_number = 0
+        self.last_recorded_date = None
+        self.create_simulation_record()  # Must be called before run!
+        if start_date is None:
+            self.randomiseStartDate()
+        else:
+            self.start_date = TradingCalendar.to_date(start_date)
         self.reset_all(self.start_date)
         self.record_portfolio(self.start_date)
 
@@ -182,79 +208,130 @@ class TradingSimulator:
             ID = f"sim_{todays_date}_{random_number}"
 
             # Check if ID already exists in database
-            conn = sqlite3.connect('data.db')
+            conn = DatabaseConnection.get()
             cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (ID,))
+            cursor.execute("SELECT 1 FROM simulations WHERE sim_id=?", (ID,))
             exists = cursor.fetchone() is not None
-            conn.close()
+            cursor.close()
             if exists:
                 Bool = True
             else:
                 Bool = False
         return ID
 
-    def create_simulation_table(self) -> None:
-        """Create table to track daily balance and stock changes"""
-        conn = sqlite3.connect('data.db')
+    def create_simulation_record(self) -> None:
+        """Register the simulation, its daily rows are stored in the simulationResults table"""
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
-        
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS "{self.current_simulation_id}" (
-                entry_number INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                current_balance REAL,
-                total_invested_balance REAL,
-                total_cash_profit REAL,
-                portfolio_value REAL,
-                portfolio_performance REAL,
-                ticker TEXT,
-                cash_invested REAL,
-                cash_withdrawn REAL,
-                investment_value REAL,
-                investment_performance REAL,
-                current_stock_performance REAL,
-                number_of_stocks INTEGER
-            )
-        """)
+        cursor.execute("""
+            INSERT INTO simulations (sim_id, name, created) VALUES (?, ?, ?)
+        """, (self.current_simulation_id, self.current_simulation_id, datetime.now().strftime("%Y-%m-%d")))
         conn.commit()
-        conn.close()  
+        cursor.close()
 
     def record_portfolio(self, date):
         """Record the state of all stocks and balance on a specific day"""
         for stock in self.stocks.values():
-            self.record_transaction(stock,date)
+            self.record_transaction(stock, date, buffered=True)
+        self.flush_transactions()
         
-    def record_transaction(self, stock, date):
-        """Record transaction data into database after each stock transaction"""
-        # Validate table name to prevent SQL injection
-        if not self.current_simulation_id or not self.current_simulation_id.isidentifier():
-            raise ValueError("Invalid simulation ID for table name.")
+    def record_transaction(self, stock, date, buffered: bool = False):
+        """Record transaction data into database after each stock transaction.
+        Buffered rows are held in memory until flush_transactions() is called,
+        unbuffered rows (manual trades) are written straight away."""
+        if not self.current_simulation_id:
+            raise ValueError("No simulation ID set")
 
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            INSERT INTO "{self.current_simulation_id}" 
-            (date, current_balance, total_invested_balance, total_cash_profit, portfolio_value, portfolio_performance, ticker, cash_invested,
-            cash_withdrawn, investment_value, investment_performance, current_stock_performance, number_of_stocks)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,(
-                date,
-                self.balance.getCurrentBalance(),
-                self.balance.getTotalInvestedBalance(),
-                self.balance.getTotalCashProfit(),
-                self.balance.getPortfolioValue(),
-                self.balance.getPortfolioPerformance(),
-                stock.get_ticker(),
-                stock.get_cash_invested(),
-                stock.get_cash_withdrawn(),
-                stock.get_investment_value(),
-                stock.get_investment_performance(),
-                stock.get_current_stock_performance(),
-                stock.get_number_stocks()
-            ))
-        
-        conn.commit()
-        conn.close()
+        self.transaction_buffer.append(self.transaction_row(stock, date))
+        if not buffered:
+            self.flush_transactions()
+
+    def flush_transactions(self) -> None:
+        """Write all buffered rows to the simulationResults table in a single transaction,
+        and update the simulation's snapshot with each stock's latest row in the same transaction"""
+        if not self.transaction_buffer:
+            return
+
+        conn = DatabaseConnection.get()
+        with conn:
+            cursor = conn.executemany("""
+                INSERT INTO simulationResults
+                (sim_id, date, current_balance, total_invested_balance, total_cash_profit, portfolio_value, portfolio_performance, ticker, cash_invested,
+                cash_withdrawn, investment_value, investment_performance, current_stock_performance, number_of_stocks, loop_number)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, self.transaction_buffer)
+            #rows inserted in one transaction get consecutive entry numbers ending at the last inserted one
+            last_entry = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.executemany("""
+                INSERT INTO simulationSnapshots
+                (sim_id, ticker, entry_number, start_date, start_balance, date, current_balance, total_invested_balance, total_cash_profit,
+                portfolio_value, portfolio_performance, cash_invested, cash_withdrawn, investment_value, investment_performance,
+                current_stock_performance, number_of_stocks)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (sim_id, ticker) DO UPDATE SET
+                    entry_number = excluded.entry_number, date = excluded.date, current_balance = excluded.current_balance,
+                    total_invested_balance = excluded.total_invested_balance, total_cash_profit = excluded.total_cash_profit,
+                    portfolio_value = excluded.portfolio_value, portfolio_performance = excluded.portfolio_performance,
+                    cash_invested = excluded.cash_invested, cash_withdrawn = excluded.cash_withdrawn,
+                    investment_value = excluded.investment_value, investment_performance = excluded.investment_performance,
+                    current_stock_performance = excluded.current_stock_performance, number_of_stocks = excluded.number_of_stocks
+                """, self.snapshot_rows(last_entry))
+            conn.execute("""
+                UPDATE simulations SET start_date = COALESCE(start_date, ?), start_balance = COALESCE(start_balance, ?),
+                end_date = ?, final_value = ?, return_pct = ?
+                WHERE sim_id = ?
+                """, self.summary_row())
+        self.transaction_buffer = []
+
+    def summary_row(self) -> tuple:
+        """Summary of the simulation after the latest buffered row, for the simulations table.
+        The start date and balance are only used when the summary is first written"""
+        first, last = self.transaction_buffer[0], self.transaction_buffer[-1]
+        start_balance = self.balance.getStartBalance()
+        final_value = last[2] + last[5] #cash balance + portfolio value
+        return_pct = (final_value / start_balance - 1) * 100 if start_balance > 0 else 0.0
+        return (first[1], start_balance, last[1], final_value, return_pct, last[0])
+
+    def snapshot_rows(self, last_entry: int) -> list[tuple]:
+        """Latest buffered row of each stock, in simulationSnapshots column order.
+        The start date and balance are only used when a stock's snapshot is first written"""
+        start_date = self.transaction_buffer[0][1]
+        start_balance = self.balance.getStartBalance()
+        #search back from the last row, a long buffer has every stock in its last date's rows
+        latest = {}
+        for position in range(len(self.transaction_buffer) - 1, -1, -1):
+            row = self.transaction_buffer[position]
+            latest.setdefault((row[0], row[7]), (last_entry - len(self.transaction_buffer) + 1 + position, row))
+            if len(latest) == len(self.stocks):
+                break
+        return [
+            (row[0], row[7], entry_number, start_date, start_balance) + tuple(row[1:7]) + tuple(row[8:14])
+            for entry_number, row in latest.values()
+        ]
+
+    def transaction_row(self, stock, date) -> tuple:
+        """Snapshot of the balance and a stock, in simulationResults column order"""
+        key = PriceStore.to_key(date)
+        if self.last_recorded_date is not None and key < self.last_recorded_date:
+            self.loop_number += 1
+        self.last_recorded_date = key
+        return (
+            self.current_simulation_id,
+            date,
+            self.balance.getCurrentBalance(),
+            self.balance.getTotalInvestedBalance(),
+            self.balance.getTotalCashProfit(),
+            self.balance.getPortfolioValue(),
+            self.balance.getPortfolioPerformance(),
+            stock.get_ticker(),
+            stock.get_cash_invested(),
+            stock.get_cash_withdrawn(),
+            stock.get_investment_value(),
+            stock.get_investment_performance(),
+            stock.get_current_stock_performance(),
+            stock.get_number_stocks(),
+            self.loop_number
+        )
 
     def get_new_random_number(self) -> int:
         """Generate a random number not in the previous_numbers list"""
@@ -288,34 +365,49 @@ class TradingSimulator:
     # 2.2 configuration - previous simulation
     def load_prev_simulation(self, sim_id: str) -> None:
         """Load a previous simulation by ID"""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
+        snapshot = self.get_simulation_snapshot(sim_id)
         
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name=?", (sim_id,))
-        if not cursor.fetchone():
-            raise ValueError(f"Simulation {sim_id} does not exist")
-        
-        #set simulation ID
+        #set simulation ID, rows recorded from here continue its latest loop
         self.current_simulation_id = sim_id
+        self.last_recorded_date = PriceStore.to_key(snapshot[-1]["date"])
+        self.loop_number = DatabaseConnection.get().execute(
+            "SELECT MAX(loop_number) FROM simulationResults WHERE sim_id=?", (sim_id,)).fetchone()[0] or 0
 
         #set new start date to the day after the last date in the simulation
-        cursor.execute(f"SELECT date FROM {sim_id} ORDER BY entry_number DESC LIMIT 1")
-        last_date = cursor.fetchone()[0]
-        if not last_date:
-            raise ValueError(f"No data found for simulation {sim_id}")
-        self.start_date = self.get_next_day(last_date)
+        self.start_date = self.get_next_day(snapshot[-1]["date"])
 
         #set balance
         list_of_stocks = self.stocks.values()
-        self.balance.set_balance_from_sim(sim_id, list_of_stocks)
+        self.balance.set_balance_from_sim(snapshot, list_of_stocks)
         
-        #loop through stocks and set their values based on the simulation ID
+        #loop through stocks and set their values from their latest row
+        rows = {row["ticker"]: row for row in snapshot}
         for Stock in self.stocks.values():
-            Stock.set_stock_from_simulation(sim_id)
+            if Stock.get_ticker() not in rows:
+                raise ValueError(f"No simulation data found for ID: {sim_id} on last entry for ticker: {Stock.get_ticker()}")
+            Stock.set_stock_from_simulation(rows[Stock.get_ticker()], snapshot[-1]["date"])
     
         print(f"previous simultion: {sim_id} has been loaded in")
 
 
+    def get_simulation_snapshot(self, sim_id: str) -> list[dict]:
+        """Latest row of every stock in a simulation, oldest first (the last one is the simulation's
+        latest row). One lookup on the simulationSnapshots primary key"""
+        conn = DatabaseConnection.get()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM simulationSnapshots WHERE sim_id=? ORDER BY entry_number", (sim_id,))
+        columns = [column[0] for column in cursor.description]
+        snapshot = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        if not snapshot:
+            cursor.execute("SELECT 1 FROM simulations WHERE sim_id=?", (sim_id,))
+            exists = cursor.fetchone()
+            cursor.close()
+            if not exists:
+                raise ValueError(f"Simulation {sim_id} does not exist")
+            raise ValueError(f"No data found for simulation {sim_id}")
+        cursor.close()
+        return snapshot
+
     # 2.3 configuration - timeframe
     def set_timeframe(self, days: int) -> None:
         """Set simulation date range from start date for the given number of days."""
@@ -323,14 +415,7 @@ class TradingSimulator:
             raise ValueError("Start date not set")
 
         # convert start_date to date object
-        if isinstance(self.start_date, str):
-            start_dt = datetime.strptime(self.start_date, "%Y-%m-%d").date()
-        elif isinstance(self.start_date, datetime):
-            start_dt = self.start_date.date()
-        elif isinstance(self.start_date, date):
-            start_dt = self.start_date
-        else:
-            raise TypeError("self.start_date must be a string, datetime, or date")
+        start_dt = TradingCalendar.to_date(self.start_date)
 
         end_dt = start_dt + timedelta(days=days)
         self.start_date = start_dt.strftime("%Y-%m-%d")
@@ -347,37 +432,12 @@ class TradingSimulator:
         
     def _validate_dates(self, start_date, end_date) -> bool:
         """Check if start date exists and end date is within available data."""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        # Check start date exists
-        cursor.execute("""
-            SELECT EXISTS(
-                SELECT 1 FROM historicalData 
-                WHERE date = ?
-                LIMIT 1
-            )
-        """, (start_date,))
-        start_exists = bool(cursor.fetchone()[0])
+        calendar = TradingCalendar.shared()
+        start_exists = calendar.exists(start_date)
 
-        # Check end date exists
-        cursor.execute("""
-            SELECT EXISTS(
-                SELECT 1 FROM historicalData 
-                WHERE date = ?
-                LIMIT 1
-            )
-        """, (end_date,))
-        end_exists = bool(cursor.fetchone()[0])
+        # Accept the end date if it, or any later date, is a trading date
+        end_exists = calendar.on_or_after(end_date) is not None
 
-        if not end_exists:
-            # Accept if there is any date >= end_date
-            cursor.execute("""
-                SELECT MIN(date) FROM historicalData WHERE date >= ?
-            """, (end_date,))
-            next_date = cursor.fetchone()[0]
-            end_exists = next_date is not None
-
-        conn.close()
         return start_exists and end_exists
 
 
@@ -440,66 +500,136 @@ class TradingSimulator:
         
 
     # 4 simulation Execution
-    def run_simulation(self):
-        """repeatedly run simulation for the number of days given by the user"""
-        print("initial run")
-        self.sim_run()
-        self.calc_days_left()
-        
-        count = 2
-        while (not self.validDates) and 0 < self.days_left_in_simulation:
-            print(f"run: {count}")
+    def run_simulation(self) -> bool:
+        """repeatedly run simulation for the number of days given by the user.
+        Returns False if cancel() stopped it early, the simulation then ends on the last date it completed"""
+        #a background refresh of the market data waits for the run to end before swapping in new prices
+        with Database.dataLock:
+            self.cancel_requested = False
+            self.progress_total_days = self.current_timeframe_in_days
+            self.report_progress(0)
+            #the vector engine plans every loop first, then simulates the dates of all of them in one go
+            planned_runs = [] if self.engine == "vector" else None
+            print("initial run")
+            completed = self.sim_run(planned_runs)
             self.calc_days_left()
-            print(f"days left: {self.days_left_in_simulation}")
-            self.set_timeframe(self.days_left_in_simulation)
-            self.sim_run()
-            count += 1
-
-        print("simulation runs are now completed")
-
-        #change the start date to be the day AFTER the last date
-        self.start_date = self.get_next_day(self.end_date)
-        print(f"simulation ended on: {self.end_date}")
-        print(f"new start date: {self.start_date}")
         
-    def sim_run(self) -> None:
-        """Run simulation for the set timeframe"""
+            count = 2
+            while completed and (not self.validDates) and 0 < self.days_left_in_simulation:
+                if planned_runs is None:
+                    #the day by day loop can also stop between loops
+                    if self.cancel_requested:
+                        completed = False
+                        self.end_date = self.database.getEndDate()
+                        break
+                    self.report_progress(self.progress_total_days - self.days_left_in_simulation)
+                print(f"run: {count}")
+                print(f"days left: {self.days_left_in_simulation}")
+                self.set_timeframe(self.days_left_in_simulation)
+                completed = self.sim_run(planned_runs)
+                #recalculate before checking again, a loop can finish exactly on the last day
+                self.calc_days_left()
+                count += 1
+            if planned_runs:
+                completed = self.run_planned(planned_runs)
+
+            if completed:
+                self.report_progress(self.progress_total_days)
+                print("simulation runs are now completed")
+            else:
+                print("simulation cancelled")
+
+            #change the start date to be the day AFTER the last date
+            self.start_date = self.get_next_day(self.end_date)
+            print(f"simulation ended on: {self.end_date}")
+            print(f"new start date: {self.start_date}")
+            return completed
+
+    def cancel(self) -> None:
+        """Ask a running simulation to stop after the chunk of dates it is on. Every completed date
+        stays recorded, so the simulation can be continued from the day after"""
+        self.cancel_requested = True
+
+    def report_progress(self, days_done: int) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(min(days_done, self.progress_total_days), self.progress_total_days)
+        
+    def sim_run(self, planned_runs: list = None) -> bool:
+        """Run simulation for the set timeframe. Returns False if it was cancelled part way.
+        Given a planned_runs list, the run is only added to it for run_planned()"""
         if self.current_timeframe_in_days <= 0:
             raise ValueError("insufficient number of days in timeframe. must be at least 1")
 
         # Generate all trading dates between start and end date (inclusive)
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT date FROM historicalData
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date ASC
-        """, (self.start_date, self.end_date))
-        rows = cursor.fetchall()
-        conn.close()
-
-        list_of_stocks = self.stocks.values()
-        dates = [row[0] for row in rows]
-        for date in dates:  # each loop = daily cycle
-            for stock in self.stocks.values():
-                stock.dailyStockUpdate(date)
-                self.strategies.apply(stock, dates.index(date))
-                self.balance.daily_balance_update(self.current_simulation_id, list_of_stocks) #type: ignore
-                self.record_transaction(stock, date)
+        dates = TradingCalendar.shared().range(self.start_date, self.end_date)
+        #days of the whole run_simulation done before this run's first date
+        run = (dates, self.progress_total_days - self.current_timeframe_in_days, self.start_date)
+        if planned_runs is not None:
+            planned_runs.append(run)
+        elif self.engine == "vector":
+            if not self.run_planned([run]):
+                return False
+        else:
+            days_done = self.sim_run_legacy(dates)
+            if days_done < len(dates):
+                self.end_date = dates[days_done - 1]
+                return False
         if not self.validDates:
-            self.start_date = self.get_loop_restart_date()                           
+            self.start_date = self.get_loop_restart_date()
+        return True
+
+    def run_planned(self, runs: list) -> bool:
+        """Simulate runs of (dates, days done before them, start date) with the vector engine, one after
+        the other in a single pass. Each run's strategies count days from its own first date.
+        Returns False if it was cancelled part way, the simulation then ends on the last date completed"""
+        dates = [date for run_dates, _, _ in runs for date in run_dates]
+        day_index = np.concatenate([np.arange(len(run_dates)) for run_dates, _, _ in runs])
+        progress_days = np.concatenate([
+            days_before + (np.asarray(run_dates, dtype="datetime64[D]") - np.datetime64(start_date, "D")).astype(int) + 1
+            for run_dates, days_before, start_date in runs
+        ])
+        days_done = VectorEngine(self.stocks.keys()).run(self, dates, day_index, progress_days)
+        if days_done < len(dates):
+            self.end_date = dates[days_done - 1]
+            return False
+        return True
+
+    def sim_run_legacy(self, dates) -> int:
+        """Run the simulation one date and one stock at a time.
+        Returns the number of dates completed (fewer than given if cancelled)"""
+        #days of the whole run_simulation done before this run's first date
+        days_before = self.progress_total_days - self.current_timeframe_in_days
+        start_date = TradingCalendar.to_date(self.start_date)
+        #Stock.dailyStockUpdate for every stock of a date at once, from the run's price matrices
+        stocks = list(self.stocks.values())
+        slots = self.portfolio.get_slots(self.stocks.keys())
+        if dates:
+            values, performance = VectorEngine(self.stocks.keys()).load_prices(dates)
+        try:
+            for day_index, date in enumerate(dates):  # each loop = daily cycle
+                self.portfolio.daily_update(values[day_index], performance[day_index], slots)
+                for stock in stocks:
+                    self.strategies.apply(stock, day_index)
+                    self.balance.daily_balance_update(stock)
+                    self.record_transaction(stock, date, buffered=True)
+                if self.flush_interval_days and (day_index + 1) % self.flush_interval_days == 0:
+                    self.flush_transactions()
+                #progress and cancelling only between whole dates, every stock of a date is recorded
+                if (day_index + 1) % self.progress_interval_days == 0:
+                    if self.cancel_requested:
+                        return day_index + 1
+                    self.report_progress(days_before + (TradingCalendar.to_date(date) - start_date).days + 1)
+        finally:
+            self.flush_transactions()
+        return len(dates)
 
     def calc_days_left(self):
         """calculate the number of days left over after running an incomplete simulation"""
         #calculate incomplete simulation time frame
-        start_date = self.start_date
-        end_date = self.database.getEndDate()
-        if isinstance(start_date, str):
-            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-        if isinstance(end_date, str):
-            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-        if start_date is None or end_date is None:
+        if self.start_date is None or self.database.getEndDate() is None:
             raise ValueError("Start date or end date is not set correctly.")
+        start_date = TradingCalendar.to_date(self.start_date)
+        end_date = TradingCalendar.to_date(self.database.getEndDate())
 
         sim_days = (end_date - start_date).days + 1  # +1 to include end date 
 
@@ -513,59 +643,18 @@ class TradingSimulator:
         """If a time frame is longer than we have days for, use the final date we have
         to locate a previous date with similar values. Now, everytime the final date is 
         reached, we continue from this date with similar values"""
-        
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        
-        finalDate = self.database.getEndDate() 
-        value_range = 0.05
-        dates = []
-
-        #find all valid dates where stocks have a similar value 
-        while len(dates) == 0:
-            for Stock in self.stocks.values():
-                ticker = Stock.get_ticker()
-                OpeningValue = Stock.fetchOpeningValue(ticker, finalDate)
-                upperBound = OpeningValue * (1+value_range)
-                lowerBound = OpeningValue * (1-value_range)
-
-                cursor.execute("""
-                            SELECT date FROM historicalData 
-                            WHERE open >= ? AND open <= ? 
-                            AND stock_ticker = ?
-                            AND date < ?
-                """,(lowerBound ,upperBound, ticker, finalDate))
-                
-                #add any dates found to the list
-                dates = [row[0] for row in cursor.fetchall()]
-
-
-            #Convert to datetime objects
-            date_objects = [datetime.strptime(date, '%Y-%m-%d') for date in dates]
-            #Find the earliest
-            earliest_date = min(date_objects)
-            #Optional: convert back to string
-            earliest_date_str = earliest_date.strftime('%Y-%m-%d')
-            
-            if len(dates) < 10:
-                #if not enough dates are returned increase the range by 5% and restart the process
-                value_range = value_range + 0.05
-                dates = []
-        
-        conn.close()
+        #the earliest date on which the last stock opened within 5% of its final opening value
+        #(widened 5% at a time until at least 10 dates qualify), cached per end date and stock.
+        #each stock's matches replace the previous one's, so only the last stock decides the date
+        finalDate = self.database.getEndDate()
+        earliest_date_str = PriceStore.shared().get_restart_date(list(self.stocks.keys())[-1], finalDate,
+                                                                 band_step=0.05, min_matches=10)
         print("loop restart date: " + earliest_date_str)
         return earliest_date_str
 
     def get_next_day(self, date) -> str:
         """Find the day after a given date"""
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT MIN(date) FROM historicalData 
-            WHERE date > ?
-        """, (date,))
-        next_day = cursor.fetchone()[0]
-        conn.close()
+        next_day = TradingCalendar.shared().next(date)
 
         if next_day is None: 
             next_day = self.get_loop_restart_date()
@@ -592,145 +681,162 @@ class TradingSimulator:
 
 
     # 6 plot graphs
-    def get_sim_graph_data(self) -> dict:
+    def get_sim_graph_data(self, max_points: int = None, after_entry: int = None) -> dict:
         """
         Plot simulation graph - show progression of portfolio value.
-        Returns a dict: { "days": [1, 2, 3, ...], "balances": [1000, 1050, 1025, ...] }
+        Returns a dict of NumPy arrays: { "days": [1, 2, 3, ...], "balances": [1000, 1050, 1025, ...] }
+        plus the "first_date", "last_date" and "last_entry" (entry_number) of the rows it read.
         Only starts counting days after the first investment.
+        With max_points the series is downsampled to at most that many points (see downsample),
+        without it every day is returned.
+        With after_entry only the rows recorded after that entry are read (days counted from 1 again),
+        to extend a graph that has already been plotted.
         """
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
 
-        #find first entry where simulation has been run 
-            #investment_performance only begins updating after simulation run and not during initial trade
-        cursor.execute(f"""
-            SELECT entry_number
-            FROM {self.current_simulation_id}
-            WHERE investment_performance != 0
-            ORDER BY entry_number ASC
-            LIMIT 1
-        """)
-        results = cursor.fetchone()
-
-        #if no investements have ever been made, return no data
-        if results is None:
-            return {
-            "days": [0],
-            "balances": [0]
-            }
-        first_entry = int(results[0])
-
-        #retrieve portfolio values for each day, starting from when the first investment was made
-        cursor.execute(f"""
-            SELECT date, portfolio_value
-            FROM {self.current_simulation_id}
-            WHERE entry_number >= ?
-            ORDER BY entry_number ASC
-        """,(first_entry,))
-        results = cursor.fetchall()
-        conn.close()
-
-        balances = []
-        current_date = None
-        last_portfolio_value = None
-
-        for date, portfolio_value in results:
-            if current_date is None:
-                # first row
-                current_date = date
-                last_portfolio_value = portfolio_value
-            elif date == current_date:
-                # same date -> update last portfolio value to this row
-                last_portfolio_value = portfolio_value
-            else:
-                # date changed -> save last portfolio value for previous date
-                if last_portfolio_value is not None:
-                    balances.append(float(last_portfolio_value))
-                current_date = date
-                last_portfolio_value = portfolio_value
-
-        # append portfolio value for last date
-        if last_portfolio_value is not None:
-            balances.append(float(last_portfolio_value))
+        if after_entry is None:
+            #find first entry where simulation has been run 
+                #investment_performance only begins updating after simulation run and not during initial trade
+            cursor.execute("""
+                SELECT entry_number
+                FROM simulationResults
+                WHERE sim_id = ?
+                AND investment_performance != 0
+                ORDER BY entry_number ASC
+                LIMIT 1
+            """, (self.current_simulation_id,))
+            results = cursor.fetchone()
+
+            #if no investements have ever been made, return no data
+            if results is None:
+                return {
+                "days": np.array([0]),
+                "balances": np.array([0.0])
+                }
+            first_entry = int(results[0])
+        else:
+            first_entry = after_entry + 1
 
-        days = list(range(1, len(balances) + 1))
+        cursor.close()
 
-        return {"days": days, "balances": balances}
+        #portfolio value at the end of each day, starting from when the first investment was made
+        return self.daily_series("portfolio_value", first_entry, None, max_points)
                     
-    def get_stock_graph_data(self, Stock) -> dict:
+    def get_stock_graph_data(self, Stock, max_points: int = None, after_entry: int = None) -> dict:
         """
         get stock graph data - show progression of invested balance of a particular stock
-        Returns a dict: { "days": [1, 2, 3, ...], "balances": [1000, 1050, 1025, ...] }
+        Returns a dict of NumPy arrays: { "days": [1, 2, 3, ...], "balances": [1000, 1050, 1025, ...] }
+        plus the "first_date", "last_date" and "last_entry" of the rows it read.
         Only starts counting days after the first investment.
+        max_points and after_entry work as in get_sim_graph_data.
         """
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
 
         ticker = Stock.get_ticker()
 
-       #find first entry where simulation has been run 
-            #investment_performance only begins updating after simulation run and not during initial trade
-        cursor.execute(f"""
-            SELECT entry_number
-            FROM {self.current_simulation_id}
-            WHERE ticker = ?
-            AND investment_performance != 0
-            ORDER BY entry_number ASC
-            LIMIT 1
-        """,(ticker,))
-        results = cursor.fetchone()
-
-        #if this stock has never been purchased, return no data
-        if results is None:
-            data = {
-            "days": [0],
-            "balances": [0]
-            }
-            return data
-
-        first_purchase = int(results[0])
-
-        #return investment value for a stock, starting from when the first purchase was made
-        cursor.execute(f"""
-            SELECT date, investment_value
-            FROM {self.current_simulation_id}
-            WHERE entry_number >= ?
-            AND ticker = ?
-        """, (first_purchase, ticker,))
-        results = cursor.fetchall()
-        conn.close()
-
-        balances = []
-        current_date = None
-        last_investment_value = None
-
-        for date, investment_value in results:
-            if current_date is None:
-                # first row
-                current_date = date
-                last_investment_value = investment_value
-            elif date == current_date:
-                # same date -> update last portfolio value to this row
-                last_investment_value = investment_value
-            else:
-                # date changed -> save last portfolio value for previous date
-                if last_investment_value is not None:
-                    balances.append(float(last_investment_value))
-                current_date = date
-                last_investment_value = investment_value
+        if after_entry is None:
+           #find first entry where simulation has been run 
+                #investment_performance only begins updating after simulation run and not during initial trade
+            cursor.execute("""
+                SELECT entry_number
+                FROM simulationResults
+                WHERE sim_id = ?
+                AND ticker = ?
+                AND investment_performance != 0
+                ORDER BY entry_number ASC
+                LIMIT 1
+            """,(self.current_simulation_id, ticker,))
+            results = cursor.fetchone()
+
+            #if this stock has never been purchased, return no data
+            if results is None:
+                data = {
+                "days": np.array([0]),
+                "balances": np.array([0.0])
+                }
+                return data
+
+            first_purchase = int(results[0])
+        else:
+            first_purchase = after_entry + 1
 
-        # append portfolio value for last date
-        if last_investment_value is not None:
-            balances.append(float(last_investment_value))
+        cursor.close()
 
-        days = list(range(1, len(balances) + 1))
+        #investment value of the stock at the end of each day, starting from when the first purchase was made
+        return self.daily_series("investment_value", first_purchase, ticker, max_points)
 
-        return {"days": days, "balances": balances}
 
+    def daily_series(self, column: str, first_entry: int, ticker: str = None, max_points: int = None) -> dict:
+        """
+        Graph data of a simulationResults column from first_entry on: the value of the last row of
+        every simulated day as NumPy arrays, days numbered from 1, downsampled to max_points if given.
+        """
+        rows = self.last_rows_per_day(self.current_simulation_id, [column], first_entry, ticker)
+        if not rows:
+            return {"days": np.zeros(0, dtype=np.int64), "balances": np.zeros(0),
+                    "first_date": None, "last_date": None, "last_entry": None}
+        dates, values, entries = zip(*rows)
+        balances = np.array(values, dtype=float)
+        days = np.arange(1, len(balances) + 1)
+        if max_points is not None:
+            days, balances = self.downsample(days, balances, max_points)
+        return {"days": days, "balances": balances,
+                "first_date": dates[0], "last_date": dates[-1], "last_entry": entries[-1]}
+
+    @staticmethod
+    def last_rows_per_day(sim_id: str, columns: list, first_entry: int = 0, ticker: str = None) -> list[tuple]:
+        """
+        (date, *columns, entry_number) of the last row of every simulated day from first_entry on,
+        of the whole simulation or of one stock, in entry order.
+        The database picks the last row of each day (GROUP BY loop_number, date on the sim_id/loop/date
+        index, or the sim_id/ticker/loop/date index for a stock) and only one row per day is read.
+        A date simulated again after the time loop is a separate day, it has a higher loop number.
+        """
+        where = "sim_id = ? AND entry_number >= ?"
+        params = [sim_id, first_entry]
+        if ticker is not None:
+            where += " AND ticker = ?"
+            params.append(ticker)
+
+        conn = DatabaseConnection.get()
+        rows = conn.execute(f"""
+            SELECT {", ".join(f"r.{column}" for column in ["date"] + columns)}, r.entry_number
+            FROM (
+                SELECT MIN(entry_number) AS first_entry, MAX(entry_number) AS last_entry
+                FROM simulationResults
+                WHERE {where}
+                GROUP BY loop_number, date
+            ) AS days
+            JOIN simulationResults AS r ON r.entry_number = days.last_entry
+            ORDER BY days.first_entry
+        """, params).fetchall()
+        return rows
+
+    @staticmethod
+    def downsample(x: np.ndarray, y: np.ndarray, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Min/max bucket downsampling: split the series into equal buckets and keep the lowest and
+        highest point of each (in their original order) plus the first and last point, so peaks
+        and drops stay visible. Series with max_points or fewer points are returned unchanged.
+        """
+        if max_points < 4:
+            raise ValueError("max_points must be at least 4")
+        if len(y) <= max_points:
+            return x, y
+        buckets = (max_points - 2) // 2
+        bucket = np.arange(len(y)) * buckets // len(y)
+        #sorted by bucket then value: the first of each bucket is its minimum, the last its maximum
+        order = np.lexsort((y, bucket))
+        starts = np.flatnonzero(np.diff(bucket[order], prepend=-1))
+        ends = np.append(starts[1:], len(order)) - 1
+        keep = np.unique(np.concatenate(([0, len(y) - 1], order[starts], order[ends])))
+        return x[keep], y[keep]
 
     #admin methods
     def rename_simulation(self, sim_id, new_name: str) -> bool:
-        """Rename a simulation table"""
+        """Change the display name of a simulation"""
         # Allow only letters, digits, spaces, and underscores
         new_name = new_name.strip() # Remove leading/trailing whitespace
         # Check length and character validity
@@ -740,24 +846,30 @@ class TradingSimulator:
         if not re.fullmatch(r"[A-Za-z0-9_ ]{1,50}", new_name):
             print("Invalid simulation name. Use only letters, numbers, spaces, or underscores.")
             return False
-        new_name = new_name.replace('"', '""') # Escape embedded double quotes  
 
         if not sim_id or not new_name:
             raise ValueError("Simulation ID and new name cannot be empty")
         
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
         
         # Check if simulation exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (sim_id,))
+        cursor.execute("SELECT 1 FROM simulations WHERE sim_id=?", (sim_id,))
         if not cursor.fetchone():
             print(f"Simulation {sim_id} does not exist")
+            cursor.close()
             return False
-        
-        # Rename the table
-        cursor.execute(f"ALTER TABLE \"{sim_id}\" RENAME TO \"{new_name}\"")
+
+        # Names must stay unique so simulations can be told apart
+        cursor.execute("SELECT 1 FROM simulations WHERE name=? AND sim_id!=?", (new_name, sim_id))
+        if cursor.fetchone():
+            print(f"A simulation named {new_name} already exists")
+            cursor.close()
+            return False
+
+        cursor.execute("UPDATE simulations SET name=? WHERE sim_id=?", (new_name, sim_id))
         conn.commit()
-        conn.close()
+        cursor.close()
         
         print(f"Simulation {sim_id} renamed to {new_name}")
         return True
@@ -767,41 +879,53 @@ class TradingSimulator:
         if not sim_id:
             raise ValueError("Simulation ID cannot be empty")
         
-        conn = sqlite3.connect('data.db')
+        conn = DatabaseConnection.get()
         cursor = conn.cursor()
         
         # Check if simulation exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (sim_id,))
+        cursor.execute("SELECT 1 FROM simulations WHERE sim_id=?", (sim_id,))
         if not cursor.fetchone():
             print(f"Simulation {sim_id} does not exist")
+            cursor.close()
             return False
-        
-        # Delete the table
-        cursor.execute(f"DROP TABLE \"{sim_id}\"")
-        conn.commit()
-        conn.close()
+
+        # Delete the simulation's rows and its metadata
+        with conn:
+            cursor.execute("DELETE FROM simulationResults WHERE sim_id=?", (sim_id,))
+            cursor.execute("DELETE FROM simulationSnapshots WHERE sim_id=?", (sim_id,))
+            cursor.execute("DELETE FROM simulations WHERE sim_id=?", (sim_id,))
+        cursor.close()
         
         print(f"Simulation {sim_id} deleted")
         return True
 
+    @staticmethod
+    def count_simulations() -> int:
+        return DatabaseConnection.get().execute("SELECT COUNT(*) FROM simulations").fetchone()[0]
+
+    @staticmethod
+    def get_simulation_summaries(limit: int = None, offset: int = 0) -> list[dict]:
+        """Summaries of stored simulations, oldest first: sim_id, name, created, start_date, end_date,
+        start_balance, final_value and return_pct (None until the simulation has rows).
+        Reads only the simulations table, a page at a time with limit and offset"""
+        conn = DatabaseConnection.get()
+        cursor = conn.execute("""
+            SELECT sim_id, name, created, start_date, end_date, start_balance, final_value, return_pct
+            FROM simulations ORDER BY created, rowid LIMIT ? OFFSET ?
+        """, (-1 if limit is None else limit, offset))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
     def too_many_simulations(self) -> bool:
-        """Check if there are too many simulations in the database"""
-        sim_limit = 10  # Set your limit here
+        """Check if a new simulation would go over max_simulations (None = no limit).
+        Only creating simulations is limited, stored ones can always be opened"""
+        if self.max_simulations is None:
+            return False
 
-        # Count the number of simulation tables in the database
-        conn = sqlite3.connect('data.db')
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM sqlite_master 
-            WHERE type='table' 
-            AND name NOT IN ('historicalData', 'sqlite_sequence')
-        """)
-        count = cursor.fetchone()[0]
-        
-        conn.close()
+        # Count the number of simulations in the database
+        count = self.count_simulations()
         
-        if count >= sim_limit:
+        if count >= self.max_simulations:
             print("Too many simulations in the database. Please delete some.")
             return True
         return False
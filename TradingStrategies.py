@@ -1,4 +1,5 @@
 
+import numpy as np
 from Stock import Stock
 from Balance import Balance
 
@@ -7,7 +8,8 @@ class TradingStrategies:
     A dedicated class for all trading strategies to keep the main simulation clean.
     Usage:
     1. Initialize with strategies dictionary
-    2. Call apply() during simulation
+    2. Call apply() during simulation, one stock and day at a time,
+       or evaluate_batch() to work out every trade over a whole run at once
     """
     def __init__(self, balance: Balance):
         self.balance = balance
@@ -52,11 +54,153 @@ class TradingStrategies:
 
     def _stop_loss(self, stock: Stock, config: dict):
         threshold = config.get('threshold', 0.1)
-        if stock.get_current_stock_value() <= (1 - threshold) * stock.get_opening_stock_value():
+        if stock.get_number_stocks() > 0 and \
+            stock.get_current_stock_value() <= (1 - threshold) * stock.get_opening_stock_value():
             self.balance.sell(stock, stock.get_number_stocks())
 
     def _dollar_cost_avg(self, stock: Stock, config: dict, day_index: int):
         shares = config.get('shares', 5)
         interval = config.get('interval', 7)
         if isinstance(day_index, int) and day_index % interval == 0:
-            self.balance.purchase(stock, shares)
\ No newline at end of file
+            self.balance.purchase(stock, shares)
+
+    #batch evaluation
+    def signal_masks(self, tickers, prices: np.ndarray, opening_values, day_index=None) -> tuple:
+        """
+        Price conditions of every strategy over a date x ticker matrix, ignoring holdings and balance.
+        Returns boolean take profit, stop loss and dollar cost averaging masks (dollar cost averaging
+        counts days from the first row, or uses the day_index given for each row) plus each ticker's
+        dollar cost averaging share amount.
+        """
+        take_profit = np.zeros(prices.shape, dtype=bool)
+        stop_loss = np.zeros(prices.shape, dtype=bool)
+        dollar_cost_avg = np.zeros(prices.shape, dtype=bool)
+        dca_shares = np.zeros(len(tickers), dtype=np.int64)
+        day_index = np.arange(len(prices)) if day_index is None else np.asarray(day_index)
+        for column, ticker in enumerate(tickers):
+            strategies = self.stock_strategies.get(ticker, {})
+            opening = opening_values[column]
+            if strategies.get('take_profit', {}).get('active', False):
+                threshold = strategies['take_profit'].get('threshold', 0.2)
+                take_profit[:, column] = prices[:, column] >= (1 + threshold) * opening
+            if strategies.get('stop_loss', {}).get('active', False):
+                threshold = strategies['stop_loss'].get('threshold', 0.1)
+                stop_loss[:, column] = prices[:, column] <= (1 - threshold) * opening
+            if strategies.get('dollar_cost_avg', {}).get('active', False):
+                dca_shares[column] = strategies['dollar_cost_avg'].get('shares', 5)
+                interval = strategies['dollar_cost_avg'].get('interval', 7)
+                dollar_cost_avg[:, column] = day_index % interval == 0
+        return take_profit, stop_loss, dollar_cost_avg, dca_shares
+
+    def evaluate_batch(self, tickers, prices, opening_values, shares, cash: float = None, day_index=None) -> dict:
+        """
+        Work out every trade apply() would make over a whole run in one pass.
+        prices is a price series for one ticker or a date x ticker matrix (one column per ticker
+        in tickers), with opening_values and shares the starting values per ticker.
+        Take profit and stop loss only fire while a position is open, so a sale switches them off
+        until dollar cost averaging buys back in. Purchases need the balance to cover them when
+        cash is given (trades are then settled in date, ticker order like the simulation loop).
+        day_index is the apply() day index of each row, counting from the first row by default.
+        Sales, purchases and holdings are worked out with array operations. Only once a purchase
+        cannot be afforded do the trades depend on the path of the shared cash balance, the cells
+        from there on are stepped through one at a time (see step_cells).
+        Returns date x ticker arrays of the "take_profit", "stop_loss" and "dollar_cost_avg"
+        triggers that fired, the "sell_quantity" and "buy_quantity" traded, the "number_of_stocks"
+        held after each day's trades, and the final "cash".
+        """
+        single_series = np.ndim(prices) == 1
+        if single_series:
+            tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        prices = np.asarray(prices, dtype=float).reshape(len(prices), -1)
+        days, width = prices.shape
+        take_profit, stop_loss, dollar_cost_avg, dca_shares = self.signal_masks(
+            tickers, prices, np.ravel(opening_values), day_index)
+        start = np.asarray(shares, dtype=np.int64).reshape(width)
+        condition = take_profit | stop_loss
+        purchase = np.where(dollar_cost_avg, dca_shares[None, :], 0)
+
+        #within a cell the sale comes before the purchase, so cell (row, ticker) sells at position 2 * row
+        #and buys at 2 * row + 1. A position is open on a sell condition when something was bought (or
+        #held from the start, position -1) after the last sell condition, which then always sold
+        positions = 2 * np.arange(days)[:, None]
+        last_buy = np.maximum.accumulate(np.where(purchase > 0, positions + 1, -3), axis=0)
+        last_buy = np.maximum(np.concatenate((np.full((1, width), -3), last_buy[:-1])), np.where(start > 0, -1, -3))
+        last_condition = np.maximum.accumulate(np.where(condition, positions, -2), axis=0)
+        last_condition = np.concatenate((np.full((1, width), -2), last_condition[:-1]))
+        sold = condition & (last_buy > last_condition)
+
+        #holdings are the starting shares (until the first sale) plus everything bought since the last sale
+        bought = np.cumsum(purchase, axis=0)
+        last_sale = np.maximum.accumulate(np.where(sold, np.arange(days)[:, None], -1), axis=0)
+        bought_before_sale = np.take_along_axis(bought - purchase, np.maximum(last_sale, 0), axis=0)
+        number_of_stocks = np.where(last_sale >= 0, bought - bought_before_sale, start + bought)
+        held_before = np.concatenate((start[None, :], number_of_stocks[:-1]))
+        sell_quantity = np.where(sold, held_before, 0)
+        buy_quantity = purchase.copy()
+
+        if cash is not None:
+            #cash after each cell's sale and purchase, added one at a time in (date, ticker) order
+            costs = prices * buy_quantity
+            changes = np.stack((prices * sell_quantity, -costs), axis=2).ravel()
+            totals = np.cumsum(np.concatenate(([float(cash)], changes)))
+            unaffordable = np.flatnonzero((buy_quantity.ravel() > 0) & (totals[1::2] < costs.ravel()))
+            if len(unaffordable):
+                first = int(unaffordable[0])
+                row, column = divmod(first, width)
+                holdings = np.where(np.arange(width) < column, number_of_stocks[row], held_before[row]).tolist()
+                cash = self.step_cells(first, prices, condition, purchase, holdings, float(totals[2 * first]),
+                                       sell_quantity, buy_quantity, number_of_stocks)
+            else:
+                cash = float(totals[-1])
+
+        results = {
+            "take_profit": take_profit & (sell_quantity > 0),
+            "stop_loss": stop_loss & ~take_profit & (sell_quantity > 0),  # take profit is checked first
+            "dollar_cost_avg": buy_quantity > 0,
+            "sell_quantity": sell_quantity,
+            "buy_quantity": buy_quantity,
+            "number_of_stocks": number_of_stocks,
+        }
+        if single_series:
+            results = {name: values[:, 0] for name, values in results.items()}
+        results["cash"] = cash
+        return results
+
+    @staticmethod
+    def step_cells(first: int, prices, condition, purchase, holdings: list, cash: float,
+                   sell_quantity, buy_quantity, number_of_stocks) -> float:
+        """
+        Settle the trades from flat cell index first onwards one cell at a time, when the cash balance
+        decides which purchases happen. Only cells with a sell condition or purchase are visited.
+        Overwrites those cells of the quantity and holding arrays in place and returns the final cash.
+        """
+        days, width = prices.shape
+        sells = sell_quantity.reshape(-1)
+        buys = buy_quantity.reshape(-1)
+        held = number_of_stocks.reshape(-1)
+        sells[first:] = 0
+        buys[first:] = 0
+        held[first:] = -1 #filled in below
+        start = np.array(holdings, dtype=np.int64)
+        cells = first + np.flatnonzero((condition | (purchase > 0)).ravel()[first:])
+        for cell, value, sell, amount in zip(cells.tolist(), prices.ravel()[cells].tolist(),
+                                             condition.ravel()[cells].tolist(), purchase.ravel()[cells].tolist()):
+            column = cell % width
+            if sell and holdings[column] > 0:
+                sells[cell] = holdings[column]
+                cash += value * holdings[column]
+                holdings[column] = 0
+            if amount:
+                price = value * amount
+                if cash >= price:
+                    cash -= price
+                    buys[cell] = amount
+                    holdings[column] += amount
+            held[cell] = holdings[column]
+
+        #cells without trades keep the ticker's holding from the cell above (or from the start of the stepping)
+        grid = np.concatenate((start[None, :], held.reshape(days, width)))
+        rows = np.maximum.accumulate(np.where(grid >= 0, np.arange(days + 1)[:, None], 0), axis=0)
+        filled = np.take_along_axis(grid, rows, axis=0)[1:]
+        held[first:] = filled.ravel()[first:]
+        return cash
@@ -0,0 +1,232 @@
+from datetime import timedelta
+
+import numpy as np
+from PriceStore import PriceStore
+from Stock import Stock
+from TradingCalendar import TradingCalendar
+
+class VectorEngine:
+    """
+    Array based alternative to the day by day loop in TradingSimulator.sim_run.
+    Prices for the whole run are loaded as one date x ticker matrix and the trades come from
+    TradingStrategies.evaluate_batch, everything else (cash, investment values, portfolio value
+    and performance) is filled in with array operations.
+    The rows produced match the legacy loop exactly, including the order of the floating
+    point operations.
+    Usage:
+    1. Create with the tickers of the simulation (in the simulator's stock order)
+    2. Call run() with the simulator and the trading dates of the run (the dates of every loop of
+       a time looped run can be given at once, with their day indexes)
+       (or load_prices() and simulate() to work on arrays without a simulator)
+    """
+    def __init__(self, tickers, window: int = None):
+        self.tickers = list(tickers)
+        self.window = window or Stock.performance_window
+        self.store = None  # PriceStore, looked up when prices are first loaded
+
+    def load_prices(self, dates) -> tuple[np.ndarray, np.ndarray]:
+        """Opening values and stock performance for the given dates, as date x ticker arrays.
+        Dates a ticker did not trade on use its previous opening value, like Stock.fetchOpeningValue."""
+        if self.store is None:
+            self.store = PriceStore.shared()
+        all_dates = self.store.get_all_dates()
+        #trading dates of a run are usually a contiguous block of the calendar (not when it loops)
+        first = int(np.searchsorted(all_dates, PriceStore.to_key(dates[0])))
+        rows = np.arange(first, first + len(dates))
+        if rows[-1] >= len(all_dates) or all_dates[rows[-1]] != PriceStore.to_key(dates[-1]):
+            rows = np.searchsorted(all_dates, np.asarray([PriceStore.to_key(day) for day in dates]))
+        opens = self.store.get_matrix(self.tickers, "open")
+
+        #carry each ticker's last known value forward over the dates it has no data for
+        last_known = np.where(np.isnan(opens), -1, np.arange(len(all_dates))[:, None])
+        last_known = np.maximum.accumulate(last_known[:rows.max() + 1], axis=0)[rows]
+        for column, ticker in enumerate(self.tickers):
+            missing = np.flatnonzero(last_known[:, column] < 0)
+            if len(missing):
+                raise ValueError(f"No data found for {ticker} before {PriceStore.to_key(dates[missing[0]])}")
+        values = opens[last_known, np.arange(len(self.tickers))]
+
+        performance = self.store.get_performance_matrix(self.tickers, self.window)[rows]
+        #dates a ticker did not trade on are searched the same way Stock.fetchStockPerformance does
+        for row, column in zip(*np.nonzero(np.isnan(performance))):
+            today = TradingCalendar.to_date(dates[row])
+            performance[row, column] = self.store.get_performance(self.tickers[column], today - timedelta(days=self.window), today)
+        return values, performance
+
+    def simulate(self, opens: np.ndarray, state: dict, strategies, day_index=None) -> dict:
+        """
+        Run a TradingStrategies' strategies over a date x ticker matrix of opening values
+        (day_index as in TradingStrategies.evaluate_batch).
+        state holds the starting "cash", "total_invested", "total_cash_profit" and "portfolio_value"
+        and per ticker arrays of "shares", "cash_invested", "cash_withdrawn", "opening_values" and
+        "investment_values" (each ticker's share of the portfolio value, as Balance.investmentValues).
+        Returns date x ticker arrays of every recorded column and of the shares sold and bought,
+        plus the final state.
+        """
+        days, width = opens.shape
+        trades = strategies.evaluate_batch(self.tickers, opens, state["opening_values"], state["shares"], float(state["cash"]), day_index)
+        sold = trades["sell_quantity"] > 0
+        bought = trades["buy_quantity"] > 0
+        sale_prices = np.where(sold, opens * trades["sell_quantity"], 0.0)
+        purchase_prices = np.where(bought, opens * trades["buy_quantity"], 0.0)
+
+        #per ticker state after each cell's strategies (for the row) and before them (for the daily
+        #update, which is the state after the previous date). Running totals are accumulated one
+        #date at a time, so they match the legacy loop's additions exactly
+        start_invested = np.asarray(state["cash_invested"], dtype=float)
+        start_withdrawn = np.asarray(state["cash_withdrawn"], dtype=float)
+        cash_invested = np.cumsum(np.concatenate((start_invested[None, :], purchase_prices)), axis=0)
+        cash_withdrawn = np.cumsum(np.concatenate((start_withdrawn[None, :], sale_prices)), axis=0)
+        invested_before, invested_after = cash_invested[:-1], cash_invested[1:]
+        withdrawn_before, withdrawn_after = cash_withdrawn[:-1], cash_withdrawn[1:]
+        number_of_stocks = trades["number_of_stocks"]
+        shares_before = np.concatenate((np.asarray(state["shares"], dtype=np.int64)[None, :], number_of_stocks[:-1]))
+
+        #Balance.sell then Balance.purchase: each cell makes up to two changes to the balance totals,
+        #added one at a time in (date, ticker) order
+        def running_total(start: float, sale_changes: np.ndarray, purchase_changes: np.ndarray) -> np.ndarray:
+            changes = np.stack((sale_changes, purchase_changes), axis=2).ravel()
+            return np.cumsum(np.concatenate(([float(start)], changes)))[2::2].reshape(days, width)
+        current_balance = running_total(state["cash"], sale_prices, -purchase_prices)
+        total_invested = running_total(state["total_invested"], -sale_prices, purchase_prices)
+        #the total cash profit swaps the stock's previous cash profit for its new one
+        sale_profit = np.where(sold, (withdrawn_after - invested_before) - (withdrawn_before - invested_before), 0.0)
+        purchase_profit = np.where(bought, (withdrawn_after - invested_after) - (withdrawn_after - invested_before), 0.0)
+        total_cash_profit = running_total(state["total_cash_profit"], sale_profit, purchase_profit)
+
+        #Stock.dailyStockUpdate: value and performance are worked out before the strategies act
+        with np.errstate(divide="ignore", invalid="ignore"):
+            overall_profit = shares_before * opens + (withdrawn_before - invested_before)
+            investment_performance = np.where(invested_before == 0, 0.0, (overall_profit / invested_before) * 100)
+        investment_value = number_of_stocks * opens
+
+        #Balance.update_portfolio_value: every cell swaps its ticker's previous investment value for
+        #the new one. A cell that sold and then bought makes two swaps (to 0, then to the new value).
+        #The changes are added one at a time in cell order, so the sum matches the legacy running total
+        initial_values = np.asarray(state["investment_values"], dtype=float)
+        previous_values = np.concatenate((initial_values[None, :], investment_value[:-1]))
+        changes = (investment_value - previous_values).ravel()
+        split = np.flatnonzero((sold & bought).ravel())
+        cell_ends = np.arange(1, days * width + 1)
+        if len(split):
+            changes[split] = investment_value.ravel()[split]
+            changes = np.insert(changes, split, 0.0 - previous_values.ravel()[split])
+            cell_ends += np.searchsorted(split, np.arange(days * width), side="right")
+        portfolio_total = np.cumsum(np.concatenate(([float(state["portfolio_value"])], changes)))
+        portfolio_value = portfolio_total[cell_ends].reshape(days, width)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            portfolio_performance = np.where(total_invested == 0.0, 0.0, ((portfolio_value - total_invested) / total_invested) * 100)
+
+        return {
+            "current_balance": current_balance,
+            "total_invested_balance": total_invested,
+            "total_cash_profit": total_cash_profit,
+            "portfolio_value": portfolio_value,
+            "portfolio_performance": portfolio_performance,
+            "cash_invested": invested_after,
+            "cash_withdrawn": withdrawn_after,
+            "investment_value": investment_value,
+            "investment_performance": investment_performance,
+            "number_of_stocks": number_of_stocks,
+            "sell_quantity": trades["sell_quantity"],
+            "buy_quantity": trades["buy_quantity"],
+            "final_state": {
+                "cash": float(current_balance[-1, -1]) if days else float(state["cash"]),
+                "total_invested": float(total_invested[-1, -1]) if days else float(state["total_invested"]),
+                "total_cash_profit": float(total_cash_profit[-1, -1]) if days else float(state["total_cash_profit"]),
+                "portfolio_value": float(portfolio_total[-1]),
+                "shares": number_of_stocks[-1].tolist() if days else list(state["shares"]),
+                "cash_invested": cash_invested[-1].tolist(),
+                "cash_withdrawn": cash_withdrawn[-1].tolist(),
+                "opening_values": state["opening_values"],
+                "investment_values": investment_value[-1].tolist() if days else list(state["investment_values"]),
+            },
+        }
+
+    #simulator adapter
+    def get_state(self, simulator) -> dict:
+        """Starting state of a simulation, in the form simulate() takes."""
+        portfolio = simulator.portfolio
+        slots = portfolio.get_slots(self.tickers)
+        balance = simulator.balance
+        return {
+            "cash": balance.getCurrentBalance(),
+            "total_invested": balance.getTotalInvestedBalance(),
+            "total_cash_profit": balance.getTotalCashProfit(),
+            "portfolio_value": balance.getPortfolioValue(),
+            "shares": portfolio.number_stocks[slots].tolist(),
+            "cash_invested": portfolio.cash_invested[slots].tolist(),
+            "cash_withdrawn": portfolio.cash_withdrawn[slots].tolist(),
+            "opening_values": portfolio.opening_stock_value[slots],
+            "investment_values": [balance.getInvestmentValue(ticker) for ticker in self.tickers],
+        }
+
+    def run(self, simulator, dates: list[str], day_index=None, progress_days=None) -> int:
+        """Simulate the given trading dates for a TradingSimulator, write every row in bulk and
+        leave the simulator's balance and stocks as the legacy loop would.
+        day_index is the strategies' day index of each date (counting from the first date by default).
+        Dates are simulated and written simulator.flush_interval_days at a time (all at once for 0),
+        with a progress report (progress_days: days done after each date) and cancel check after each
+        chunk. Returns the number of dates completed (fewer than given if cancelled)."""
+        if not dates:
+            return 0
+        day_index = np.arange(len(dates)) if day_index is None else np.asarray(day_index)
+        opens, performance = self.load_prices(dates)
+        chunk = simulator.flush_interval_days or len(dates)
+        for start in range(0, len(dates), chunk):
+            end = min(start + chunk, len(dates))
+            results = self.simulate(opens[start:end], self.get_state(simulator), simulator.strategies, day_index[start:end])
+            self.write_rows(simulator, dates[start:end], results, performance[start:end])
+            self.set_state(simulator, results, opens[end - 1], performance[end - 1])
+            if end < len(dates):
+                if simulator.cancel_requested:
+                    return end
+                if progress_days is not None:
+                    simulator.report_progress(int(progress_days[end - 1]))
+        return len(dates)
+
+    def write_rows(self, simulator, dates: list[str], results: dict, performance: np.ndarray) -> None:
+        """Write a simulate() result to the simulation table, in the same order the legacy loop
+        records rows: date by date, stock by stock. The rows come straight from a date x ticker x column table."""
+        days, width = performance.shape
+        #a date earlier than the one recorded before it starts a new loop, as in TradingSimulator.transaction_row
+        keys = np.asarray([PriceStore.to_key(day) for day in dates])
+        previous = np.concatenate([[simulator.last_recorded_date or keys[0]], keys[:-1]])
+        loop_numbers = simulator.loop_number + np.cumsum(keys < previous)
+        simulator.loop_number, simulator.last_recorded_date = int(loop_numbers[-1]), str(keys[-1])
+
+        table = np.empty((days, width, 15), dtype=object)
+        table[:, :, 0] = simulator.current_simulation_id
+        table[:, :, 1] = np.asarray(dates, dtype=object)[:, None]
+        table[:, :, 2:7] = np.stack([results[name] for name in (
+            "current_balance", "total_invested_balance", "total_cash_profit", "portfolio_value", "portfolio_performance")], axis=2)
+        table[:, :, 7] = np.asarray(self.tickers, dtype=object)
+        table[:, :, 8:13] = np.stack([results["cash_invested"], results["cash_withdrawn"], results["investment_value"],
+                                      results["investment_performance"], performance], axis=2)
+        table[:, :, 13] = results["number_of_stocks"]
+        table[:, :, 14] = loop_numbers[:, None]
+        simulator.transaction_buffer.extend(table.reshape(days * width, 15).tolist())
+        simulator.flush_transactions()
+
+    def set_state(self, simulator, results: dict, opens: np.ndarray, performance: np.ndarray) -> None:
+        """Leave the simulator's balance and stocks in the state at the end of a simulate() result,
+        given the last date's opening values and performance."""
+        final = results["final_state"]
+        balance = simulator.balance
+        balance.currentBalance = final["cash"]
+        balance.totalInvestedBalance = final["total_invested"]
+        balance.totalCashProfit = final["total_cash_profit"]
+        balance.portfolioValue = final["portfolio_value"]
+        balance.portfolioPerformance = float(results["portfolio_performance"][-1, -1])
+        #every stock is updated at once through the portfolio arrays
+        portfolio = simulator.portfolio
+        slots = portfolio.get_slots(self.tickers)
+        portfolio.current_stock_value[slots] = opens
+        portfolio.current_stock_performance[slots] = performance
+        portfolio.number_stocks[slots] = final["shares"]
+        portfolio.cash_invested[slots] = final["cash_invested"]
+        portfolio.cash_withdrawn[slots] = final["cash_withdrawn"]
+        portfolio.cash_profit[slots] = portfolio.cash_withdrawn[slots] - portfolio.cash_invested[slots]
+        portfolio.investment_value[slots] = results["investment_value"][-1]
+        portfolio.investment_performance[slots] = results["investment_performance"][-1]
+        balance.investmentValues.update(zip(self.tickers, results["investment_value"][-1].tolist()))
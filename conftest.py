@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from Database import Database
+from DatabaseConnection import DatabaseConnection
+from MarketDataProvider import CSVProvider
+from PriceStore import PriceStore
+
+def write_random_history(directory, tickers, days=400):
+    """CSV price files of a seeded random walk from 2020-01-01, one file per ticker."""
+    rng = np.random.default_rng(7)
+    dates = np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-01-01") + days)
+    for ticker in tickers:
+        opens = 100 * np.cumprod(1 + rng.normal(0, 0.02, days))
+        lines = ["Date,Open,High,Low,Close"]
+        for day, value in zip(dates, opens):
+            lines.append(f"{day},{value},{value * 1.01},{value * 0.99},{value * 1.005}")
+        (directory / f"{ticker}.csv").write_text("\n".join(lines) + "\n")
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """Point the shared connection at an empty database file for the duration of a test."""
+    original = DatabaseConnection.get_path()
+    DatabaseConnection.set_path(str(tmp_path / "data.db"))
+    PriceStore.invalidate()
+    yield DatabaseConnection.get_path()
+    DatabaseConnection.close()
+    DatabaseConnection.set_path(original)
+    PriceStore.invalidate()
+
+@pytest.fixture
+def random_history():
+    """write_random_history, for tests that need price files of their own tickers."""
+    return write_random_history
+
+@pytest.fixture
+def seeded_db(temp_db, tmp_path):
+    """Fill temp_db with random prices of the default tickers: seeded_db(days) returns the initialised Database."""
+    def seed(days: int = 400) -> Database:
+        database = Database(provider=CSVProvider(str(tmp_path)))
+        write_random_history(tmp_path, database.getTickers(), days)
+        database.initialiseDatabase()
+        return database
+    return seed
@@ -1,28 +1,29 @@
-import sqlite3
+from DatabaseConnection import DatabaseConnection
 from Database import Database  # Your existing database class
 
 def reset_database():
     # 1. Connect to existing database
-    conn = sqlite3.connect('data.db')
+    conn = DatabaseConnection.get()
     cursor = conn.cursor()
     
-    # 2. List all simulation tables to delete
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'sim_%'")
-    sim_tables = cursor.fetchall()
-    
+    # 2. Make sure the schema exists (this also migrates any old per-simulation tables)
+    Database().createDatabase()
+
     # 3. Delete all simulation data
-    for table in sim_tables:
-        cursor.execute(f"DROP TABLE {table[0]}")
+    cursor.execute("DELETE FROM simulationResults")
+    cursor.execute("DELETE FROM simulations")
+    cursor.execute("DELETE FROM simulationSnapshots")
     
-    # 4. Clear historical data while keeping structure
+    # 4. Clear historical data (and the record of what it covers) while keeping structure
     cursor.execute("DELETE FROM historicalData")
+    cursor.execute("DELETE FROM cacheManifest")
+    conn.commit()
+    cursor.close()
     
     # 5. Reinitialize with fresh data
     db = Database()
     db.initialiseDatabase()  # Your existing initialization
     
-    conn.commit()
-    conn.close()
     print("Database reset complete! Only schema and stock data remain.")
 
 if __name__ == "__main__":
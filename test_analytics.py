@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from Analytics import Analytics
+from TradingSimulator import TradingSimulator
+
+def test_metrics_of_a_known_series():
+    values = [100, 110, 99, 99, 121]
+    metrics = Analytics.compute(values, 100, traded=50)
+    returns = np.array([0.1, -0.1, 0.0, 121 / 99 - 1])
+
+    assert metrics["final_value"] == 121
+    assert metrics["return_pct"] == pytest.approx(21)
+    assert metrics["cagr_pct"] == pytest.approx((1.21 ** (252 / 4) - 1) * 100)
+    assert metrics["volatility_pct"] == pytest.approx(returns.std(ddof=1) * np.sqrt(252) * 100)
+    assert metrics["max_drawdown_pct"] == pytest.approx(10)
+    assert metrics["max_drawdown_days"] == 3  # high on day 1, back above it on day 4
+    assert metrics["win_rate_pct"] == pytest.approx(200 / 3)  # the flat day does not count
+    assert metrics["turnover"] == pytest.approx(50 / np.mean(values))
+    assert metrics["days"] == 5
+
+def test_metrics_are_cached_until_rows_are_added(seeded_db):
+    database = seeded_db(120)
+
+    random.seed(3)
+    simulator = TradingSimulator(5000, database=database)
+    simulator.new_simulation("2020-01-10")
+    simulator.trade_a_stock("AAPL", 10)
+    simulator.set_timeframe(30)
+    simulator.run_simulation()
+
+    analytics = Analytics()
+    sim_id = simulator.get_sim_id()
+    first = analytics.metrics(sim_id)
+    assert first["days"] == 31
+    assert first["final_value"] == pytest.approx(simulator.get_total_value())
+    assert analytics.metrics_for_all() == {sim_id: first}
+
+    simulator.set_timeframe(30)
+    simulator.run_simulation()
+    second = analytics.metrics(sim_id)
+    assert second["days"] == 62  # the second run starts the day after the first ended
+    assert second["final_value"] == pytest.approx(simulator.get_total_value())
+
+    simulator.delete_simulation(sim_id)
+    with pytest.raises(ValueError):
+        analytics.metrics(sim_id)
+    assert analytics.cache == {}
@@ -0,0 +1,263 @@
+import random
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from Database import Database
+from DatabaseConnection import DatabaseConnection
+from MarketDataProvider import CSVProvider, MarketDataProvider
+from PriceStore import PriceStore
+from Stock import Stock
+from TradingSimulator import TradingSimulator
+
+def make_frame() -> pd.DataFrame:
+    """A frame shaped like yfinance.download output for one ticker (two level columns)."""
+    index = pd.DatetimeIndex(["2020-01-02", "2020-01-03"], name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "High", "Low", "Open"], ["AAA"]], names=["Price", "Ticker"])
+    values = [
+        [10.5, 11.0, 9.0, 10.0],
+        [11.5, 12.0, 10.0, 11.0],
+    ]
+    return pd.DataFrame(values, index=index, columns=columns)
+
+def test_frame_to_rows_matches_table_layout():
+    rows = Database.frameToRows("AAA", "A Inc.", make_frame())
+    assert rows == [
+        ("2020-01-02", 10.0, 11.0, 9.0, 10.5, "AAA", "A Inc."),
+        ("2020-01-03", 11.0, 12.0, 10.0, 11.5, "AAA", "A Inc."),
+    ]
+
+def write_csv_history(directory, tickers, dates_by_ticker):
+    for ticker in tickers:
+        dates = dates_by_ticker.get(ticker, ["2020-01-02", "2020-01-03", "2020-01-06"])
+        lines = ["Date,Open,High,Low,Close"]
+        for i, day in enumerate(dates):
+            lines.append(f"{day},{10 + i},{11 + i},{9 + i},{10.5 + i}")
+        (directory / f"{ticker}.csv").write_text("\n".join(lines) + "\n")
+
+def test_offline_initialise_from_csv_provider(temp_db, tmp_path):
+    database = Database(provider=CSVProvider(str(tmp_path)))
+    write_csv_history(tmp_path, database.getTickers(), {"AAPL": ["2020-01-03", "2020-01-06", "2020-01-07"]})
+
+    database.initialiseDatabase()
+
+    #shared range: latest first date and earliest last date across tickers
+    assert str(database.getStartDate()) == "2020-01-03"
+    assert str(database.getEndDate()) == "2020-01-06"
+    count = DatabaseConnection.get().execute("SELECT COUNT(*) FROM historicalData").fetchone()[0]
+    assert count > 0
+    assert Stock.fetchOpeningValue("AAPL", "2020-01-03") == 10.0
+
+class OfflineProvider(MarketDataProvider):
+    """Fails the test if the network provider is used."""
+    def download(self, ticker: str):
+        raise AssertionError(f"unexpected download of {ticker}")
+
+def test_provider_without_download_cannot_be_created():
+    class IncompleteProvider(MarketDataProvider):
+        pass
+    with pytest.raises(TypeError):
+        IncompleteProvider()
+
+def test_warm_start_reads_only_local_data(temp_db, tmp_path):
+    cold = Database(provider=CSVProvider(str(tmp_path)))
+    write_csv_history(tmp_path, cold.getTickers(), {})
+    cold.initialiseDatabase()
+
+    warm = Database(provider=OfflineProvider())
+    warm.initialiseDatabase()
+    assert (warm.getStartDate(), warm.getEndDate()) == (cold.getStartDate(), cold.getEndDate())
+
+    #stale data with a manual policy is used as is
+    warm.maxCacheAge = timedelta(seconds=-1)
+    warm.refreshPolicy = "manual"
+    warm.initialiseDatabase()
+    assert warm.refreshThread is None
+
+def test_background_refresh_waits_for_running_simulations(temp_db, tmp_path):
+    cold = Database(provider=CSVProvider(str(tmp_path)))
+    write_csv_history(tmp_path, cold.getTickers(), {})
+    cold.initialiseDatabase()
+
+    #databases without a manifest (like the shipped data.db) are used as they are
+    conn = DatabaseConnection.get()
+    conn.execute("DELETE FROM cacheManifest")
+    conn.commit()
+    warm = Database(provider=OfflineProvider())
+    warm.initialiseDatabase()
+    assert warm.refreshThread is None
+
+    #stale data is downloaded and stored straight away, the new dates and prices wait for the run to end
+    write_csv_history(tmp_path, cold.getTickers(),
+                      dict.fromkeys(cold.getTickers(), ["2020-01-02", "2020-01-03", "2020-01-06", "2020-01-07"]))
+    stale = Database(provider=CSVProvider(str(tmp_path)))
+    stale.maxCacheAge = timedelta(seconds=-1)
+    with Database.dataLock:
+        stored_end = PriceStore.shared().get_start_and_end_dates()[1]
+        stale.initialiseDatabase()
+        deadline = time.time() + 5
+        while conn.execute("SELECT MIN(last_date) FROM cacheManifest").fetchone()[0] != "2020-01-07":
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert stale.refreshThread.is_alive()
+        assert str(stale.getEndDate()) == stored_end
+        assert PriceStore.shared().get_start_and_end_dates()[1] == stored_end
+    stale.refreshThread.join(5)
+    assert str(stale.getEndDate()) == "2020-01-07"
+    assert PriceStore.shared().get_start_and_end_dates()[1] > stored_end
+
+def test_per_simulation_tables_are_migrated(temp_db):
+    conn = DatabaseConnection.get()
+    columns = ", ".join(f"{column} REAL" for column in Database().simulationColumns)
+    conn.execute(f"CREATE TABLE sim_20250729_1 (entry_number INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+    conn.executemany("INSERT INTO sim_20250729_1 (date, ticker, investment_value) VALUES (?, ?, ?)",
+                     [("2020-01-02", "AAA", 1.0), ("2020-01-03", "AAA", 2.0), ("2020-01-02", "AAA", 3.0)])
+    conn.commit()
+
+    Database().createDatabase()
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "sim_20250729_1" not in tables
+    assert conn.execute("SELECT sim_id, name, created FROM simulations").fetchall() == [
+        ("sim_20250729_1", "sim_20250729_1", "2025-07-29")]
+    rows = conn.execute("SELECT date, investment_value, loop_number FROM simulationResults WHERE sim_id = ? ORDER BY entry_number",
+                        ("sim_20250729_1",)).fetchall()
+    #going back to an earlier date is the time loop
+    assert rows == [("2020-01-02", 1.0, 0), ("2020-01-03", 2.0, 0), ("2020-01-02", 3.0, 1)]
+    #migrated simulations get a snapshot of their latest row
+    assert conn.execute("SELECT ticker, start_date, date, investment_value FROM simulationSnapshots").fetchall() == [
+        ("AAA", "2020-01-02", "2020-01-02", 3.0)]
+
+def test_loops_of_stored_simulations_are_numbered(temp_db):
+    conn = DatabaseConnection.get()
+    columns = ", ".join(f"{column} REAL" for column in Database().simulationColumns)
+    conn.execute(f"CREATE TABLE simulationResults (entry_number INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT NOT NULL, {columns})")
+    dates = ["2020-01-02", "2020-01-03", "2020-01-06", "2020-01-03", "2020-01-06", "2020-01-03"]
+    conn.executemany("INSERT INTO simulationResults (sim_id, date, ticker) VALUES (?, ?, 'AAA')",
+                     [("sim_a", day) for day in dates] + [("sim_b", day) for day in dates[:3]])
+    conn.commit()
+
+    Database().createDatabase()
+
+    rows = conn.execute("SELECT sim_id, loop_number FROM simulationResults ORDER BY entry_number").fetchall()
+    assert rows == [("sim_a", 0), ("sim_a", 0), ("sim_a", 0), ("sim_a", 1), ("sim_a", 1), ("sim_a", 2),
+                    ("sim_b", 0), ("sim_b", 0), ("sim_b", 0)]
+
+def test_snapshot_tracks_latest_rows_and_resumes(seeded_db):
+    seeded_db(200)
+
+    random.seed(5)
+    simulator = TradingSimulator(5000)
+    simulator.flush_interval_days = 7
+    simulator.new_simulation()
+    simulator.trade_a_stock("AAPL", 10)
+    simulator.strategies.activate("AAPL", "stop_loss", threshold=0.05)
+    simulator.set_timeframe(40)
+    simulator.run_simulation()
+
+    #every snapshot row is the stock's latest row in simulationResults
+    conn = DatabaseConnection.get()
+    sim_id = simulator.get_sim_id()
+    snapshot = simulator.get_simulation_snapshot(sim_id)
+    assert len(snapshot) == len(simulator.stocks)
+    latest = conn.execute("""
+        SELECT ticker, MAX(entry_number), investment_value, number_of_stocks FROM simulationResults
+        WHERE sim_id = ? GROUP BY ticker
+    """, (sim_id,)).fetchall()
+    assert sorted((row["ticker"], row["entry_number"], row["investment_value"], row["number_of_stocks"])
+                  for row in snapshot) == sorted(latest)
+    first = conn.execute("SELECT date FROM simulationResults WHERE sim_id = ? ORDER BY entry_number LIMIT 1", (sim_id,)).fetchone()
+    assert {row["start_date"] for row in snapshot} == {first[0]}
+
+    resumed = TradingSimulator(5000)
+    resumed.load_prev_simulation(sim_id)
+    assert resumed.start_date == simulator.start_date
+    assert (resumed.loop_number, resumed.last_recorded_date) == (simulator.loop_number, simulator.last_recorded_date)
+    for name in ("currentBalance", "totalInvestedBalance", "totalCashProfit", "investmentValues"):
+        assert getattr(resumed.balance, name) == getattr(simulator.balance, name)
+    for ticker, stock in simulator.stocks.items():
+        assert resumed.get_stock(ticker).to_dict() == stock.to_dict()
+
+def test_universe_file_of_many_tickers(temp_db, tmp_path, random_history):
+    tickers = [f"T{i:03d}" for i in range(500)]
+    universe = tmp_path / "universe.csv"
+    universe.write_text("ticker,name\n" + "".join(f"{ticker},{ticker} Corp.\n" for ticker in tickers))
+    history = tmp_path / "history"
+    history.mkdir()
+    random_history(history, tickers, days=40)
+
+    database = Database(provider=CSVProvider(str(history)), universeFile=str(universe))
+    assert database.getTickers() == tickers
+    assert database.getStockName("T250") == "T250 Corp."
+
+    random.seed(3)
+    simulator = TradingSimulator(database=database)
+    simulator.engine = "vector"
+    assert simulator.get_watchlist() == tickers[:10]
+    simulator.set_watchlist(["t499", "T001"])
+    assert simulator.get_watchlist() == ["T499", "T001"]
+
+    simulator.new_simulation("2020-01-05")
+    simulator.trade_a_stock("T499", 3)
+    simulator.strategies.activate("T001", "dollar_cost_avg", shares=1, interval=2)
+    simulator.set_timeframe(10)
+    simulator.run_simulation()
+    assert simulator.get_stock("T499").get_number_stocks() == 3
+    assert simulator.get_stock("T001").get_number_stocks() == 6
+    rows = DatabaseConnection.get().execute("SELECT COUNT(*) FROM simulationSnapshots WHERE sim_id = ?",
+                                            (simulator.get_sim_id(),)).fetchone()[0]
+    assert rows == len(tickers)
+
+def test_json_universe_file(tmp_path):
+    path = tmp_path / "universe.json"
+    path.write_text('[{"ticker": "aapl", "name": "Apple Inc."}, "msft"]')
+    assert Database.loadUniverse(str(path)) == {"AAPL": "Apple Inc.", "MSFT": "MSFT"}
+    path.write_text('{"AAPL": "Apple Inc.", "aapl": "Apple again"}')
+    with pytest.raises(ValueError):
+        Database.loadUniverse(str(path))
+
+def test_simulation_summaries_follow_runs_and_page(seeded_db):
+    database = seeded_db(120)
+
+    simulator = TradingSimulator(5000, database=database)
+    sim_ids = []
+    for _ in range(3):
+        simulator.new_simulation("2020-01-10")
+        sim_ids.append(simulator.get_sim_id())
+    #a new simulation records its starting state
+    first = TradingSimulator.get_simulation_summaries(1)[0]
+    assert (first["end_date"], first["final_value"], first["return_pct"]) == ("2020-01-10", 5000, 0)
+
+    simulator.trade_a_stock("AAPL", 10)
+    simulator.set_timeframe(20)
+    simulator.run_simulation()
+    summary = TradingSimulator.get_simulation_summaries(2, 1)[1]
+    assert summary["sim_id"] == sim_ids[2]
+    assert (summary["start_date"], summary["end_date"], summary["start_balance"]) == ("2020-01-10", "2020-01-30", 5000)
+    assert summary["final_value"] == pytest.approx(simulator.get_total_value())
+    assert summary["return_pct"] == pytest.approx((simulator.get_total_value() / 5000 - 1) * 100)
+    assert TradingSimulator.count_simulations() == 3
+    assert [row["sim_id"] for row in TradingSimulator.get_simulation_summaries(offset=1)] == sim_ids[1:]
+
+    #databases from before the summary columns get them filled in from the snapshots
+    conn = DatabaseConnection.get()
+    conn.execute("CREATE TABLE old_simulations AS SELECT sim_id, name, created FROM simulations")
+    conn.execute("DROP TABLE simulations")
+    conn.execute("ALTER TABLE old_simulations RENAME TO simulations")
+    conn.commit()
+    Database().createDatabase()
+    assert TradingSimulator.get_simulation_summaries(offset=2) == [summary]
+
+def test_simulation_limit_only_counts_against_new_simulations(seeded_db):
+    database = seeded_db(60)
+
+    simulator = TradingSimulator(5000, database=database)
+    for _ in range(12):
+        simulator.new_simulation("2020-01-10")
+    assert not simulator.too_many_simulations()
+    simulator.max_simulations = 12
+    assert simulator.too_many_simulations()
+    simulator.max_simulations = None
+    assert not simulator.too_many_simulations()
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+
+from DatabaseConnection import DatabaseConnection
+from TradingSimulator import TradingSimulator
+
+def last_value_per_day(rows) -> list:
+    """Reference series: the value of the last row before the date changes."""
+    return [value for (date, value), next_row in zip(rows, rows[1:] + [(None, None)]) if date != next_row[0]]
+
+def test_graph_data_has_one_point_per_simulated_day(seeded_db):
+    database = seeded_db(120)
+
+    random.seed(4)
+    simulator = TradingSimulator(5000, database=database)
+    simulator.engine = "vector"
+    simulator.new_simulation("2020-01-10")
+    simulator.trade_a_stock("AAPL", 5)
+    simulator.strategies.activate("MSFT", "dollar_cost_avg", shares=1, interval=3)
+    for days in (40, 150):  # the second run goes round the time loop, so dates repeat
+        simulator.set_timeframe(days)
+        simulator.run_simulation()
+        simulator.trade_a_stock("AAPL", 1)
+        check_graph_data(simulator)
+
+def check_graph_data(simulator):
+    conn = DatabaseConnection.get()
+    sim_id = simulator.get_sim_id()
+    first = conn.execute("SELECT MIN(entry_number) FROM simulationResults WHERE sim_id = ? AND investment_performance != 0", (sim_id,)).fetchone()[0]
+    rows = conn.execute("SELECT date, portfolio_value FROM simulationResults WHERE sim_id = ? AND entry_number >= ? ORDER BY entry_number", (sim_id, first)).fetchall()
+    expected = last_value_per_day(rows)
+    #every loop of the simulation goes forward in time, the next one starts earlier
+    loops = conn.execute("SELECT loop_number, MIN(date), MAX(date) FROM simulationResults WHERE sim_id = ? GROUP BY loop_number", (sim_id,)).fetchall()
+    assert [loop for loop, _, _ in loops] == list(range(simulator.loop_number + 1))
+    assert all(later[1] < earlier[2] for earlier, later in zip(loops, loops[1:]))
+
+    data = simulator.get_sim_graph_data()
+    assert isinstance(data["balances"], np.ndarray)
+    assert data["balances"].tolist() == expected
+    assert data["days"].tolist() == list(range(1, len(expected) + 1))
+
+    stock_rows = conn.execute("SELECT date, investment_value FROM simulationResults WHERE sim_id = ? AND ticker = 'MSFT' ORDER BY entry_number", (sim_id,)).fetchall()
+    stock_data = simulator.get_stock_graph_data(simulator.get_stock("MSFT"))
+    assert stock_data["balances"].tolist()[-20:] == last_value_per_day(stock_rows)[-20:]
+
+def test_downsample_keeps_extremes_and_ends():
+    rng = np.random.default_rng(1)
+    values = np.cumsum(rng.normal(0, 1, 10000))
+    days = np.arange(1, len(values) + 1)
+    x, y = TradingSimulator.downsample(days, values, 500)
+
+    assert len(x) <= 500
+    assert (np.diff(x) > 0).all()
+    assert x[0] == 1 and x[-1] == len(values)
+    assert y.min() == values.min() and y.max() == values.max()
+    assert (values[x - 1] == y).all()
+    short_x, short_y = TradingSimulator.downsample(days[:100], values[:100], 500)
+    assert len(short_x) == 100
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from MonteCarlo import MonteCarlo
+from ParameterSweep import ParameterSweep
+from TradingStrategies import TradingStrategies
+
+def test_seeded_batch_is_reproducible_and_matches_single_runs(seeded_db):
+    seeded_db(300)
+
+    strategies = TradingStrategies(None)
+    strategies.activate("AAPL", "take_profit", threshold=0.1)
+    strategies.activate("MSFT", "dollar_cost_avg", shares=2, interval=5)
+    batch = MonteCarlo(["AAPL", "MSFT"], 90, strategies, start_balance=5000, initial_shares={"AAPL": 10})
+
+    first = batch.run(20, seed=4, workers=1)
+    again = batch.run(20, seed=4, workers=2, chunk_size=3)
+    other = batch.run(20, seed=5, workers=1)
+    assert first["start_dates"] == again["start_dates"]
+    assert np.array_equal(first["final_value"], again["final_value"])
+    assert first["start_dates"] != other["start_dates"]
+    #every start date leaves a full timeframe of data
+    assert max(first["start_dates"]) <= "2020-07-28"
+
+    percentiles = list(first["percentiles"]["return_pct"].values())
+    assert percentiles == sorted(percentiles)
+    assert first["percentiles"]["max_drawdown_pct"][50] == pytest.approx(np.median(first["max_drawdown_pct"]))
+
+    #each run is the same backtest a parameter sweep over its dates would give
+    start = first["start_dates"][0]
+    end = str(np.datetime64(start) + np.timedelta64(90, "D"))
+    sweep = ParameterSweep(["AAPL", "MSFT"], start, end, start_balance=5000, initial_shares={"AAPL": 10})
+    row = sweep.run([strategies.stock_strategies], workers=1)[0]
+    assert row["final_value"] == first["final_value"][0]
@@ -0,0 +1,27 @@
+from ParameterSweep import ParameterSweep
+
+def test_sweep_ranks_every_combination(seeded_db):
+    seeded_db(200)
+
+    combinations = ParameterSweep.grid({
+        "AAPL": {"take_profit": {"threshold": [0.05, 0.1, 0.2]}, "stop_loss": {}},
+        "MSFT": {"dollar_cost_avg": {"shares": [1, 3], "interval": [5, 10]}},
+    })
+    assert len(combinations) == 12
+    assert combinations[0]["AAPL"]["stop_loss"] == {"active": True}
+
+    sweep = ParameterSweep(["AAPL", "MSFT"], "2020-01-01", "2020-06-30", start_balance=5000, initial_shares={"AAPL": 10})
+    in_process = sweep.run(combinations, workers=1)
+    pooled = sweep.run(combinations, workers=2, chunk_size=5)
+
+    assert pooled == in_process
+    assert [row["rank"] for row in pooled] == list(range(1, 13))
+    assert all(a["final_value"] >= b["final_value"] for a, b in zip(pooled, pooled[1:]))
+    assert all(row["trades"] > 0 and row["max_drawdown_pct"] >= 0 for row in pooled)
+
+def test_zero_starting_balance_has_no_return(seeded_db):
+    seeded_db(60)
+
+    sweep = ParameterSweep(["AAPL"], "2020-01-01", "2020-02-28", start_balance=0)
+    rows = sweep.run(ParameterSweep.grid({"AAPL": {"take_profit": {}}}), workers=1)
+    assert rows[0]["final_value"] == 0.0 and rows[0]["return_pct"] == 0.0
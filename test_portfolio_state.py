@@ -0,0 +1,43 @@
+import numpy as np
+
+from PortfolioState import PortfolioState
+from Stock import Stock
+
+def test_stocks_are_views_over_portfolio_slots():
+    portfolio = PortfolioState()
+    apple = Stock("Apple Inc.", "AAPL", 100.0, 1.5, portfolio=portfolio)
+    tesla = Stock("Tesla Inc.", "TSLA", 200.0, -2.0, portfolio=portfolio)
+    assert portfolio.tickers == ["AAPL", "TSLA"]
+    assert portfolio.opening_stock_value.tolist() == [100.0, 200.0]
+
+    apple.set_number_stocks(3)
+    apple.set_cash_invested(300.0)
+    portfolio.number_stocks[1] = 4
+    portfolio.cash_invested[1] = 800.0
+    assert tesla.get_number_stocks() == 4 and type(tesla.get_number_stocks()) is int
+    assert type(apple.get_cash_invested()) is float
+
+    #updating every slot at once gives the same state as updating each stock on its own
+    portfolio.daily_update(np.array([110.0, 150.0]), np.array([0.5, -1.0]))
+    single = Stock("Apple Inc.", "AAPL", 100.0, 1.5)
+    single.set_number_stocks(3)
+    single.set_cash_invested(300.0)
+    single.current_stock_value = 110.0
+    single.current_stock_performance = 0.5
+    single.update_cash_profit()
+    single.update_investment_value()
+    single.update_investment_performance()
+    assert apple.to_dict() == single.to_dict()
+    assert tesla.get_investment_value() == 600.0 and tesla.get_investment_performance() == -25.0
+
+def test_stock_fields_convert_assigned_values():
+    stock = Stock("Apple Inc.", "AAPL", 100.0, 1.5)
+    stock.set_number_stocks(3.0)
+    assert stock.get_number_stocks() == 3 and type(stock.get_number_stocks()) is int
+    stock.set_cash_invested(np.int64(250))
+    assert stock.get_cash_invested() == 250.0 and type(stock.get_cash_invested()) is float
+
+    stock.current_stock_value = None
+    assert stock.get_current_stock_value() is None
+    stock.number_stocks = None
+    assert stock.get_number_stocks() == 0
@@ -0,0 +1,98 @@
+import shutil
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PriceStore import PriceStore
+from TradingCalendar import TradingCalendar
+
+def make_store(tmp_path) -> PriceStore:
+    db_path = str(tmp_path / "prices.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE historicalData (
+            date TEXT, open REAL, high REAL, low REAL, close REAL,
+            stock_ticker TEXT, stock_name TEXT, PRIMARY KEY (stock_ticker, date)
+        )
+    """)
+    rows = [
+        ("2020-01-02", 10.0, 11.0, 9.0, 10.5, "AAA", "A Inc."),
+        ("2020-01-03", 11.0, 12.0, 10.0, 11.5, "AAA", "A Inc."),
+        ("2020-01-06", 12.0, 13.0, 11.0, 12.5, "AAA", "A Inc."),
+        ("2020-01-03", 50.0, 51.0, 49.0, 50.5, "BBB", "B Inc."),
+    ]
+    conn.executemany("INSERT INTO historicalData VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    store = PriceStore(db_path)
+    store.load()
+    return store
+
+def test_exact_and_previous_date_lookups(tmp_path):
+    store = make_store(tmp_path)
+    assert store.get_value("AAA", "2020-01-03", "open") == 11.0
+    assert store.get_value("AAA", date(2020, 1, 5), "close") == 11.5  # weekend -> previous trading day
+    assert store.get_value("BBB", "2020-01-10", "open") == 50.0
+    with pytest.raises(ValueError):
+        store.get_value("BBB", "2020-01-02", "open")
+    with pytest.raises(ValueError):
+        store.get_value("CCC", "2020-01-02", "open")
+
+def test_dates_and_range(tmp_path):
+    store = make_store(tmp_path)
+    assert store.get_dates("AAA", "2020-01-03", "2020-01-06") == ["2020-01-03", "2020-01-06"]
+    assert store.get_dates("CCC", "2020-01-01", "2020-12-31") == []
+    assert store.get_start_and_end_dates() == ("2020-01-02", "2020-01-06")
+
+def test_performance_uses_first_open_and_last_close(tmp_path):
+    store = make_store(tmp_path)
+    assert store.get_performance("AAA", "2020-01-01", "2020-01-06") == pytest.approx(25.0)
+    #empty window falls back to the first date in the database
+    assert store.get_performance("AAA", "2020-01-04", "2020-01-05") == pytest.approx(15.0)
+
+def test_rolling_performance_index_matches_window_search(tmp_path):
+    store = make_store(tmp_path)
+    for window in (1, 3, 30):
+        for day in store.get_dates("AAA", "2020-01-01", "2020-12-31"):
+            start = date.fromisoformat(day) - timedelta(days=window)
+            expected = store.get_performance("AAA", start, day)
+            assert store.get_rolling_performance("AAA", window, day) == pytest.approx(expected)
+    assert store.get_rolling_performance("AAA", 30, "2020-01-04") is None  # not a trading date
+
+def test_trading_calendar_navigation(tmp_path):
+    store = make_store(tmp_path)
+    calendar = TradingCalendar(np.concatenate([series["date"] for series in store.series.values()]))
+    assert len(calendar) == 3  # shared dates are only counted once
+    assert calendar.index("2020-01-06") == 2
+    assert calendar.next("2020-01-03") == "2020-01-06"
+    assert calendar.next(date(2020, 1, 4)) == "2020-01-06"
+    assert calendar.previous("2020-01-06") == "2020-01-03"
+    assert calendar.previous("2020-01-02") is None
+    assert calendar.next("2020-01-06") is None
+    assert calendar.on_or_after("2020-01-04") == "2020-01-06"
+    assert calendar.range("2020-01-01", "2020-01-05") == ["2020-01-02", "2020-01-03"]
+    assert not calendar.exists("2020-01-04")
+
+def test_restart_date_widens_band_until_enough_matches(tmp_path):
+    store = make_store(tmp_path)
+    #AAA opens at 10, 11, 12 and ends at 12: 2020-01-03 is within 10%, 2020-01-02 needs 20%
+    assert store.get_restart_date("AAA", "2020-01-06", band_step=0.1, min_matches=1) == "2020-01-03"
+    assert store.get_restart_date("AAA", "2020-01-06", band_step=0.1, min_matches=2) == "2020-01-02"
+    with pytest.raises(ValueError):
+        store.get_restart_date("AAA", "2020-01-06", band_step=0.1, min_matches=3)
+
+def test_restart_date_on_shipped_prices_is_far_from_the_end(tmp_path):
+    db_path = str(tmp_path / "data.db")
+    shutil.copy(Path(__file__).with_name("data.db"), db_path)
+    store = PriceStore(db_path)
+    store.load()
+    end_date = store.get_start_and_end_dates()[1]
+
+    #the loop has to replay a long stretch of history, not the last few weeks
+    restart_date = store.get_restart_date("JNJ", end_date)
+    assert restart_date == "2022-03-29"
+    assert date.fromisoformat(end_date) - date.fromisoformat(restart_date) > timedelta(days=365)
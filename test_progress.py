@@ -0,0 +1,65 @@
+from DatabaseConnection import DatabaseConnection
+from TradingSimulator import TradingSimulator
+
+def test_cancelled_run_keeps_whole_days_and_can_continue(seeded_db):
+    database = seeded_db(200)
+
+    simulator = TradingSimulator(5000, database=database)
+    simulator.new_simulation("2020-01-10")
+    simulator.trade_a_stock("AAPL", 5)
+    simulator.strategies.activate("MSFT", "dollar_cost_avg", shares=1, interval=3)
+    reports = []
+    def cancel_after_first_report(done, total):
+        reports.append((done, total))
+        if done > 0:
+            simulator.cancel()
+    simulator.progress_callback = cancel_after_first_report
+    simulator.progress_interval_days = 10
+    simulator.set_timeframe(150)
+
+    assert simulator.run_simulation() is False
+    assert reports == [(0, 150), (10, 150)]
+    assert simulator.end_date == "2020-01-29"  # stops at the next check, after whole dates
+    assert simulator.start_date == "2020-01-30"
+    conn = DatabaseConnection.get()
+    per_date = conn.execute("""
+        SELECT date, COUNT(*) FROM simulationResults WHERE sim_id = ? AND date > '2020-01-10' GROUP BY date
+    """, (simulator.get_sim_id(),)).fetchall()
+    assert [date for date, _ in per_date][-1] == "2020-01-29"
+    assert {count for _, count in per_date} == {len(simulator.get_tickers())}
+    #the recorded state is the state the simulator stopped in
+    stocks = [stock.to_dict() for stock in simulator.stocks.values()]
+    total_value = simulator.get_total_value()
+    simulator.load_prev_simulation(simulator.get_sim_id())
+    assert [stock.to_dict() for stock in simulator.stocks.values()] == stocks
+    assert simulator.get_total_value() == total_value
+
+    #the next run carries on from the cancelled state, the time loop included
+    simulator.progress_callback = lambda done, total: reports.append((done, total))
+    simulator.set_timeframe(400)
+    assert simulator.run_simulation() is True
+    assert reports[-1] == (400, 400)
+    simulator.load_prev_simulation(simulator.get_sim_id())
+    assert simulator.get_stock("MSFT").get_number_stocks() > 0
+
+def test_vector_engine_reports_progress_and_cancels_between_chunks(seeded_db):
+    seeded_db(200)
+
+    simulator = TradingSimulator(5000)
+    simulator.engine = "vector"
+    simulator.flush_interval_days = 10
+    simulator.new_simulation("2020-01-10")
+    reports = []
+    def cancel_after_first_chunk(done, total):
+        reports.append((done, total))
+        if done > 0:
+            simulator.cancel()
+    simulator.progress_callback = cancel_after_first_chunk
+    simulator.set_timeframe(150)
+
+    assert simulator.run_simulation() is False
+    assert reports == [(0, 150), (10, 150)]
+    assert simulator.end_date == "2020-01-29"  # stops after the next chunk
+    last_date = DatabaseConnection.get().execute(
+        "SELECT MAX(date) FROM simulationResults WHERE sim_id = ?", (simulator.get_sim_id(),)).fetchone()[0]
+    assert last_date == "2020-01-29"
@@ -0,0 +1,33 @@
+import json
+
+from DatabaseConnection import DatabaseConnection
+from SimulationRunner import SimulationRunner, main
+
+def test_cli_prints_only_json_and_engines_agree(seeded_db, capsys):
+    database = seeded_db(200)
+    capsys.readouterr()
+
+    args = ["--start-date", "2020-02-03", "--start-balance", "5000", "--days", "60",
+            "--trade", "AAPL=10", "--strategy", "AAPL:take_profit:threshold=0.05",
+            "--strategy", "MSFT:dollar_cost_avg:shares=2,interval=5"]
+    assert main(args + ["--engine", "vector"]) == 0
+    vector = json.loads(capsys.readouterr().out)
+    assert main(args + ["--engine", "legacy", "--no-save"]) == 0
+    legacy = json.loads(capsys.readouterr().out)
+
+    assert vector["start_date"] == "2020-02-03" and vector["end_date"] == "2020-04-03"
+    assert vector["stocks"]["MSFT"]["number_of_stocks"] > 0
+    for key in ("current_balance", "total_cash_profit", "portfolio_value", "total_value", "stocks"):
+        assert vector[key] == legacy[key]
+    #only the saved run is left in the database
+    saved = DatabaseConnection.get().execute("SELECT sim_id FROM simulations").fetchall()
+    assert saved == [(vector["sim_id"],)] and legacy["sim_id"] is None
+
+def test_failed_run_reports_error(seeded_db, capsys):
+    seeded_db(60)
+    capsys.readouterr()
+
+    assert main(["--start-date", "2020-01-10", "--trade", "AAPL=100000"]) == 1
+    assert "Could not trade" in json.loads(capsys.readouterr().out)["error"]
+    assert DatabaseConnection.get().execute("SELECT COUNT(*) FROM simulations").fetchone() == (0,)
+    assert SimulationRunner({"days": 5}).config["engine"] == "vector"
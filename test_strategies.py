@@ -1,3 +1,5 @@
+import numpy as np
+
 from TradingStrategies import TradingStrategies
 from Stock import Stock
 from Balance import Balance
@@ -51,5 +53,30 @@ def main():
 
     print("All real strategy tests completed!")
 
+def test_evaluate_batch_matches_daily_apply():
+    #a single price series: up past take profit, down past stop loss, then back up
+    prices = np.array([100, 105, 125, 110, 95, 85, 80, 90, 100, 130, 70, 100], dtype=float)
+    strategies = TradingStrategies(Balance(2000))
+    strategies.activate("TEST", "take_profit", threshold=0.2)
+    strategies.activate("TEST", "stop_loss", threshold=0.1)
+    strategies.activate("TEST", "dollar_cost_avg", shares=3, interval=4)
+
+    stock = Stock(name="TestStock", ticker="TEST", opening_value=100, opening_performance=0.0)
+    stock.set_number_stocks(5)
+    held = []
+    for day_index, price in enumerate(prices):
+        stock.set_current_value(price)
+        strategies.apply(stock, day_index)
+        held.append(stock.get_number_stocks())
+
+    batch = strategies.evaluate_batch("TEST", prices, [100.0], [5], cash=2000.0)
+    assert batch["number_of_stocks"].tolist() == held
+    assert batch["cash"] == strategies.balance.getCurrentBalance()
+    assert np.flatnonzero(batch["take_profit"]).tolist() == [2, 9]
+    #prices are below the stop loss on days 5, 6 and 10, but only day 5 has a position to sell
+    assert np.flatnonzero(batch["stop_loss"]).tolist() == [5]
+    assert np.flatnonzero(batch["dollar_cost_avg"]).tolist() == [0, 4, 8]
+    assert batch["sell_quantity"][2] == 8 and batch["buy_quantity"][0] == 3
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
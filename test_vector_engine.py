@@ -0,0 +1,76 @@
+import random
+import shutil
+
+import pytest
+
+from DatabaseConnection import DatabaseConnection
+from PriceStore import PriceStore
+from TradingSimulator import TradingSimulator
+from TradingStrategies import TradingStrategies
+from VectorEngine import VectorEngine
+
+def run_scenario(engine: str) -> tuple:
+    random.seed(11)
+    simulator = TradingSimulator(5000)
+    simulator.engine = engine
+    simulator.flush_interval_days = 40  # the vector engine works in chunks, some of them across a loop
+    simulator.new_simulation()
+    simulator.trade_a_stock("AAPL", 10)
+    simulator.trade_a_stock("MSFT", 5)
+    simulator.trade_a_stock("TSLA", 8)
+    simulator.strategies.activate("AAPL", "take_profit", threshold=0.05)
+    simulator.strategies.activate("TSLA", "stop_loss", threshold=0.05)
+    simulator.strategies.activate("MSFT", "dollar_cost_avg", shares=2, interval=3)
+    simulator.strategies.activate("NVDA", "dollar_cost_avg", shares=4, interval=2)
+    simulator.strategies.activate("NVDA", "take_profit", threshold=0.1)
+    simulator.strategies.activate("NVDA", "stop_loss", threshold=0.1)
+    for days in (150, 500):  # the second run wraps around the end of the data
+        simulator.set_timeframe(days)
+        simulator.run_simulation()
+
+    rows = DatabaseConnection.get().execute("""
+        SELECT date, current_balance, total_invested_balance, total_cash_profit, portfolio_value,
+        portfolio_performance, ticker, cash_invested, cash_withdrawn, investment_value,
+        investment_performance, current_stock_performance, number_of_stocks, loop_number
+        FROM simulationResults WHERE sim_id = ? ORDER BY entry_number
+    """, (simulator.get_sim_id(),)).fetchall()
+    balance = simulator.balance
+    totals = (balance.getCurrentBalance(), balance.getTotalInvestedBalance(), balance.getTotalCashProfit(),
+              balance.getPortfolioValue(), balance.getPortfolioPerformance(), simulator.start_date)
+    stocks = [stock.to_dict() for stock in simulator.stocks.values()]
+    return rows, totals, stocks
+
+def test_vector_engine_matches_legacy_loop(seeded_db, temp_db, tmp_path):
+    seeded_db()
+    DatabaseConnection.close()
+    vector_db = str(tmp_path / "vector.db")
+    shutil.copy(temp_db, vector_db)
+
+    legacy = run_scenario("legacy")
+    DatabaseConnection.set_path(vector_db)
+    PriceStore.invalidate()
+    vector = run_scenario("vector")
+
+    assert len(legacy[0]) > 1000 and legacy[0][-1][-1] > 0
+    assert vector == legacy
+
+def test_simulate_without_a_simulator(seeded_db):
+    seeded_db(60)
+
+    engine = VectorEngine(["AAPL", "MSFT"])
+    dates = PriceStore.shared().get_dates("AAPL", "2020-01-01", "2020-02-29")
+    opens, performance = engine.load_prices(dates)
+    state = {
+        "cash": 1000.0, "total_invested": 0.0, "total_cash_profit": 0.0,
+        "shares": [0, 0], "cash_invested": [0.0, 0.0], "cash_withdrawn": [0.0, 0.0],
+        "portfolio_value": 0.0, "opening_values": opens[0], "investment_values": [0.0, 0.0],
+    }
+    strategies = TradingStrategies(None)
+    strategies.activate("MSFT", "dollar_cost_avg", shares=1, interval=10)
+    results = engine.simulate(opens, state, strategies)
+
+    bought = results["number_of_stocks"][:, 1]
+    assert bought[0] == 1 and bought[-1] == len(range(0, len(dates), 10))
+    assert (results["number_of_stocks"][:, 0] == 0).all()
+    spent = results["final_state"]["cash_invested"][1]
+    assert results["final_state"]["cash"] == pytest.approx(1000.0 - spent)